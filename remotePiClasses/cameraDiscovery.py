@@ -0,0 +1,138 @@
+import fcntl
+import glob
+import os
+import re
+import struct
+from typing import List, Optional
+
+
+# VIDIOC_QUERYCAP = _IOR('V', 0, struct v4l2_capability), 104 bytes:
+#   driver[16] card[32] bus_info[32] version u32 capabilities u32 device_caps u32 reserved[3] u32
+VIDIOC_QUERYCAP = 0x80685600
+_V4L2_CAPABILITY = struct.Struct("<16s32s32sIII12x")
+V4L2_CAP_VIDEO_CAPTURE = 0x00000001
+V4L2_CAP_VIDEO_CAPTURE_MPLANE = 0x00001000
+V4L2_CAP_META_CAPTURE = 0x00800000
+V4L2_CAP_DEVICE_CAPS = 0x80000000
+
+
+class VideoDevice:
+    """
+    One `/dev/video*` node as seen through sysfs and V4L2.
+
+    - `identity`: the `/dev/v4l/by-id` (else `by-path`) link for the node,
+      which survives USB re-enumeration (video0 -> video2); the node path if
+      there is none.
+    - `can_capture`: the node delivers video frames (False for the UVC
+      metadata node every webcam also exposes). From QUERYCAP when the node
+      can be opened, else guessed from the sysfs `index` attribute.
+    """
+
+    __slots__ = ("path", "index", "name", "driver", "bus_info", "identity", "can_capture")
+
+    def __init__(self, path: str, index: int, name: str = "", driver: str = "", bus_info: str = "",
+                 identity: Optional[str] = None, can_capture: bool = True) -> None:
+        self.path = path
+        self.index = index
+        self.name = name
+        self.driver = driver
+        self.bus_info = bus_info
+        self.identity = identity or path
+        self.can_capture = can_capture
+
+    def __repr__(self) -> str:
+        return f"VideoDevice({self.path!r}, name={self.name!r}, identity={self.identity!r})"
+
+
+def _read_sysfs(path: str) -> str:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def query_capabilities(path: str):
+    """`(driver, card, bus_info, caps)` from VIDIOC_QUERYCAP, or None if the node cannot be queried."""
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        buf = bytearray(_V4L2_CAPABILITY.size)
+        fcntl.ioctl(fd, VIDIOC_QUERYCAP, buf)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    driver, card, bus_info, _version, capabilities, device_caps = _V4L2_CAPABILITY.unpack(buf)
+    caps = device_caps if capabilities & V4L2_CAP_DEVICE_CAPS else capabilities
+
+    def _text(raw: bytes) -> str:
+        return raw.split(b"\0", 1)[0].decode("utf-8", errors="replace")
+
+    return _text(driver), _text(card), _text(bus_info), caps
+
+
+def _stable_links(dev_root: str) -> dict:
+    # Real node -> by-id link (by-path only where there is no by-id name)
+    links = {}
+    for pattern in ("v4l/by-path/*", "v4l/by-id/*"):
+        for link in sorted(glob.glob(os.path.join(dev_root, pattern))):
+            links[os.path.realpath(link)] = link
+    return links
+
+
+def list_video_devices(sysfs_root: str = "/sys/class/video4linux", dev_root: str = "/dev") -> List[VideoDevice]:
+    """All `/dev/video*` nodes, lowest number first. Reads sysfs and one ioctl per node; opens no capture."""
+    nodes = []
+    for entry in glob.glob(os.path.join(sysfs_root, "video*")):
+        match = re.fullmatch(r"video(\d+)", os.path.basename(entry))
+        if match:
+            nodes.append((int(match.group(1)), entry))
+    links = _stable_links(dev_root)
+    devices = []
+    for number, entry in sorted(nodes):
+        path = os.path.join(dev_root, f"video{number}")
+        name = _read_sysfs(os.path.join(entry, "name"))
+        caps = query_capabilities(path)
+        if caps is not None:
+            driver, card, bus_info, flags = caps
+            can_capture = bool(flags & (V4L2_CAP_VIDEO_CAPTURE | V4L2_CAP_VIDEO_CAPTURE_MPLANE))
+            name = card or name
+        else:
+            # No access to the node: UVC puts the metadata node at interface index 1+
+            driver, bus_info = "", ""
+            can_capture = _read_sysfs(os.path.join(entry, "index")) in ("", "0")
+        devices.append(VideoDevice(path, number, name, driver, bus_info, links.get(os.path.realpath(path)), can_capture))
+    return devices
+
+
+def order_capture_devices(devices: List[VideoDevice], preferred: Optional[str] = None,
+                          last_identity: Optional[str] = None, fallback_index: Optional[int] = None) -> List[VideoDevice]:
+    """
+    Capture-capable devices in the order to try them: the device last used
+    successfully, then the configured one (`preferred` may be a by-id link,
+    a /dev/video path or part of the camera name). Once either is known only
+    those are returned, so a streamer never takes over another camera's node;
+    otherwise (unconfigured, nothing opened yet) `fallback_index` comes
+    first, then the rest.
+    """
+
+    def _rank(device: VideoDevice) -> int:
+        if last_identity and device.identity == last_identity:
+            return 0
+        if preferred and (
+            os.path.realpath(preferred) == os.path.realpath(device.path)
+            or preferred in (device.identity, device.path)
+            or preferred.lower() in device.name.lower()
+        ):
+            return 1
+        if fallback_index is not None and device.index == fallback_index:
+            return 2
+        return 3
+
+    ordered = sorted((d for d in devices if d.can_capture), key=lambda d: (_rank(d), d.index))
+    if preferred or last_identity:
+        return [d for d in ordered if _rank(d) <= 1]
+    return ordered
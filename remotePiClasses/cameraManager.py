@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+
+FLOOR_FPS = 0.5  # lowest rate the governor caps a camera to
+SATURATION_STEP = 0.8  # per-interval fps cut for the camera being slowed down
+RECOVERY_STEP = 1.25  # per-interval fps raise when there is room again
+SATURATION_HYSTERESIS_PERCENT = 10.0  # CPU must fall this far below the threshold to recover
+
+
+def allocate_by_weight(budget: float, demands: Dict[str, float], weights: Dict[str, float]) -> Dict[str, float]:
+    """
+    Weighted max-min split of `budget`: every consumer gets up to its weighted
+    share, and whatever a consumer does not use is re-split among the rest.
+    """
+    allocation: Dict[str, float] = {}
+    active = [key for key in demands if weights.get(key, 0.0) > 0]
+    remaining = budget
+    while active and remaining > 0:
+        total_weight = sum(weights[key] for key in active)
+        shares = {key: remaining * weights[key] / total_weight for key in active}
+        satisfied = [key for key in active if demands[key] <= shares[key]]
+        if not satisfied:
+            allocation.update(shares)
+            return allocation
+        for key in satisfied:
+            allocation[key] = demands[key]
+            remaining -= demands[key]
+            active.remove(key)
+    for key in demands:
+        allocation.setdefault(key, 0.0)
+    return allocation
+
+
+class _ManagedCamera:
+    """One camera under `CameraManager`: its streamer, shares and measured rates."""
+
+    def __init__(self, name: str, streamer, cpu_share: float, bandwidth_share: float) -> None:
+        self.name = name
+        self.streamer = streamer
+        self.cpu_share = max(0.0, float(cpu_share))
+        self.bandwidth_share = max(0.0, float(bandwidth_share))
+        self.capture_fps = 0.0
+        self.publish_fps = 0.0
+        self.cpu_cores = 0.0  # CPU seconds per second across its threads
+        self.bytes_per_sec = 0.0
+        self.saturation_cap: Optional[float] = None  # fps cap while the system CPU is saturated
+        self._last_usage: Optional[dict] = None
+        self._last_time = 0.0
+
+    def measure(self, now: float) -> None:
+        usage = self.streamer.resource_usage()
+        last, elapsed = self._last_usage, now - self._last_time
+        self._last_usage, self._last_time = usage, now
+        if last is None or elapsed <= 0:
+            return
+
+        def _rate(key: str) -> float:
+            # Counters restart with their threads after a capture restart
+            return max(0.0, usage[key] - last[key]) / elapsed
+
+        self.capture_fps = _rate("frames_read")
+        self.publish_fps = _rate("frames_published")
+        self.cpu_cores = _rate("cpu_sec")
+        self.bytes_per_sec = _rate("bytes_sent")
+
+    def capped_fps(self) -> float:
+        fps = self.streamer.effective_fps()
+        return fps if self.saturation_cap is None else min(fps, self.saturation_cap)
+
+    def stats(self) -> dict:
+        return {
+            "capture_fps": round(self.capture_fps, 2),
+            "publish_fps": round(self.publish_fps, 2),
+            "cpu_percent": round(self.cpu_cores * 100.0, 1),
+            "kbps": round(self.bytes_per_sec * 8 / 1000.0, 1),
+            "cpu_share": self.cpu_share,
+            "bandwidth_share": self.bandwidth_share,
+            "fps_limit": self.streamer.fps_limit,
+            "saturation_cap": self.saturation_cap,
+            "target_fps": self.streamer.target_fps,
+        }
+
+
+class CameraManager:
+    """
+    Runs several `CameraStreamer` pipelines (each with its own capture thread
+    and encoder workers) behind one aiohttp server.
+
+    - Each camera is served under `/<name>/` (`camera.mjpg`, `snapshot.jpg`,
+      `clip.mjpg`, `health`); the first camera added is also served at the
+      root paths, so single-camera URLs keep working.
+    - `/health` reports each camera's capture and publish FPS, CPU use (thread
+      CPU time of its capture and encoder threads) and outgoing bandwidth.
+    - Once a second a governor splits `cpu_budget_cores` and
+      `bandwidth_budget_kbps` between cameras by `cpu_share` /
+      `bandwidth_share` (weighted max-min). A camera over its allowance gets
+      its frame rate capped and recovers step by step when there is room
+      again.
+    - While system CPU is above `saturation_percent`, the cameras with the
+      lowest `cpu_share` are slowed down step by step, down to `FLOOR_FPS`;
+      a higher-share camera is only touched once every lower-share one is at
+      the floor, so the front camera keeps its rate for as long as possible.
+      Once CPU is back below the threshold (with some hysteresis) the caps are
+      lifted step by step, highest share first.
+    """
+
+    def __init__(self, cpu_budget_cores: float = 0.0, bandwidth_budget_kbps: float = 0.0,
+                 saturation_percent: float = 90.0, interval_sec: float = 1.0, debug: bool = False) -> None:
+        self.cpu_budget_cores = max(0.0, float(cpu_budget_cores))  # 0 = no CPU budget
+        self.bandwidth_budget_bps = max(0.0, float(bandwidth_budget_kbps)) * 1000.0 / 8.0  # 0 = no bandwidth budget
+        self.saturation_percent = float(saturation_percent)
+        self.interval_sec = max(0.2, float(interval_sec))
+        self.debug = debug
+        self._cameras: List[_ManagedCamera] = []
+        self._governor_task: Optional[asyncio.Task] = None
+        self._runner = None
+        self.saturated = False
+        try:
+            import psutil  # type: ignore
+            self._psutil = psutil
+        except ImportError:
+            self._psutil = None
+
+    def add_camera(self, name: str, streamer, cpu_share: float = 1.0, bandwidth_share: float = 1.0) -> None:
+        if any(camera.name == name for camera in self._cameras):
+            raise ValueError(f"Duplicate camera name '{name}'")
+        self._cameras.append(_ManagedCamera(name, streamer, cpu_share, bandwidth_share))
+
+    def get(self, name: str):
+        for camera in self._cameras:
+            if camera.name == name:
+                return camera.streamer
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "cpu_budget_cores": self.cpu_budget_cores,
+            "bandwidth_budget_kbps": round(self.bandwidth_budget_bps * 8 / 1000.0, 1),
+            "saturated": self.saturated,
+            "cameras": {camera.name: camera.stats() for camera in self._cameras},
+        }
+
+    def _throttle_for_saturation(self) -> None:
+        # Slow down the lowest-share tier that is not at the floor yet, one step per interval
+        active = [c for c in self._cameras if c.capture_fps > 0]
+        above_floor = [c for c in active if c.capped_fps() > FLOOR_FPS]
+        if not above_floor:
+            return
+        lowest = min(c.cpu_share for c in above_floor)
+        for camera in above_floor:
+            if camera.cpu_share == lowest:
+                camera.saturation_cap = max(FLOOR_FPS, camera.capped_fps() * SATURATION_STEP)
+                if self.debug:
+                    logging.info("CPU saturated; camera %s capped at %.1f fps", camera.name, camera.saturation_cap)
+
+    def _recover_from_saturation(self) -> None:
+        # Lift the caps of the highest-share tier first, one step per interval
+        capped = [c for c in self._cameras if c.saturation_cap is not None]
+        if not capped:
+            return
+        highest = max(c.cpu_share for c in capped)
+        for camera in capped:
+            if camera.cpu_share == highest:
+                raised = camera.saturation_cap * RECOVERY_STEP
+                camera.saturation_cap = None if raised >= camera.streamer.target_fps else raised
+
+    def _govern(self) -> None:
+        now = time.monotonic()
+        for camera in self._cameras:
+            camera.measure(now)
+        if self._psutil is not None:
+            cpu_percent = self._psutil.cpu_percent(interval=None)
+            if cpu_percent >= self.saturation_percent:
+                self.saturated = True
+            elif cpu_percent < self.saturation_percent - SATURATION_HYSTERESIS_PERCENT:
+                self.saturated = False
+                self._recover_from_saturation()
+            if self.saturated:
+                self._throttle_for_saturation()
+        # Per-frame cost times target_fps: what each camera would use uncapped
+        target = {c.name: float(c.streamer.target_fps) for c in self._cameras}
+        resources = []
+        if self.cpu_budget_cores > 0:
+            resources.append((self.cpu_budget_cores, {c.name: c.cpu_cores for c in self._cameras},
+                              {c.name: c.cpu_share for c in self._cameras}))
+        if self.bandwidth_budget_bps > 0:
+            resources.append((self.bandwidth_budget_bps, {c.name: c.bytes_per_sec for c in self._cameras},
+                              {c.name: c.bandwidth_share for c in self._cameras}))
+        desired_fps = {c.name: min(target[c.name], c.saturation_cap or target[c.name]) for c in self._cameras}
+        for budget, usage, weights in resources:
+            per_frame = {c.name: usage[c.name] / c.capture_fps for c in self._cameras if c.capture_fps > 0}
+            demand = {name: cost * target[name] for name, cost in per_frame.items()}
+            allowance = allocate_by_weight(budget, demand, weights)
+            for name, cost in per_frame.items():
+                if cost > 0:
+                    desired_fps[name] = min(desired_fps[name], allowance.get(name, 0.0) / cost)
+
+        for camera in self._cameras:
+            if camera.capture_fps <= 0:
+                continue  # idle: nothing measured
+            streamer = camera.streamer
+            current = streamer.effective_fps()
+            wanted = desired_fps[camera.name]
+            if wanted < current * 0.95:
+                streamer.set_fps_limit(max(FLOOR_FPS, wanted))
+                if self.debug:
+                    logging.info("Camera %s over budget; fps limit %.1f", camera.name, streamer.fps_limit)
+            elif streamer.fps_limit is not None and wanted > current * 1.05:
+                # Recover gradually so one quiet second does not cause a burst
+                streamer.set_fps_limit(min(wanted, current * RECOVERY_STEP))
+
+    async def _governor_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_sec)
+            try:
+                self._govern()
+            except Exception:
+                logging.exception("Camera governor failed")
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8081) -> None:
+        from aiohttp import web  # type: ignore
+
+        app = web.Application()
+        for position, camera in enumerate(self._cameras):
+            try:
+                await camera.streamer.start_capture()
+            except Exception:
+                logging.exception("Failed to start camera %s", camera.name)
+                continue
+            camera.streamer.add_routes(app, f"/{camera.name}")
+            if position == 0:
+                camera.streamer.add_routes(app, health=False)
+
+        async def health_handler(_: "web.Request") -> "web.Response":
+            return web.json_response({
+                "status": "ok",
+                "manager": self.stats(),
+                "cameras": {camera.name: camera.streamer.health() for camera in self._cameras},
+            })
+
+        app.router.add_get("/health", health_handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        self._runner = runner
+        if self._psutil is not None:
+            self._psutil.cpu_percent(interval=None)  # prime the system CPU sampler
+        self._governor_task = asyncio.create_task(self._governor_loop())
+        logging.info("Camera server running on %s:%s with cameras: %s", host, port,
+                     ", ".join(camera.name for camera in self._cameras))
+
+    async def stop(self) -> None:
+        if self._governor_task is not None:
+            self._governor_task.cancel()
+            self._governor_task = None
+        if self._runner is not None:
+            try:
+                await self._runner.cleanup()
+            except Exception:
+                pass
+            self._runner = None
+        for camera in self._cameras:
+            camera.streamer.stop_capture()
+        logging.info("Camera server stopped")
@@ -1,9 +1,143 @@
 import asyncio
 import logging
+import os
+import queue
+import socket
 import threading
 import time
 from typing import Optional
 
+from remotePiClasses.cameraDiscovery import list_video_devices, order_capture_devices
+from remotePiClasses.frameBus import FrameBusWriter
+from remotePiClasses.frameRing import FrameRing
+from remotePiClasses.latencyStats import LatencyHistogram
+
+
+MJPEG_BOUNDARY = "frame"
+
+
+class _PublishedFrame:
+    """
+    One encoded frame, framed once as a complete multipart part (boundary,
+    headers, JPEG, trailer) and shared read-only by every stream client.
+    `head` (boundary and header lines) and `body` (blank line, JPEG, trailer)
+    are views of `part`, so a client can slip its own `X-Send-Time` header in
+    between without copying the frame; `jpeg` is a zero-copy view of the payload.
+    `captured_at` (camera read returned) and `published_at` (encode done) are
+    `time.monotonic()` seconds.
+    """
+
+    __slots__ = ("seq", "part", "head", "body", "jpeg", "captured_at", "published_at", "wall_time")
+
+    def __init__(self, seq: int, jpeg_buffer, captured_at: float, published_at: float) -> None:
+        payload = memoryview(jpeg_buffer).cast("B")
+        self.wall_time = time.time() - (published_at - captured_at)  # capture time on the wall clock
+        header = (
+            f"--{MJPEG_BOUNDARY}\r\n"
+            f"Content-Type: image/jpeg\r\n"
+            f"Content-Length: {payload.nbytes}\r\n"
+            f"X-Frame-Seq: {seq}\r\n"
+            f"X-Timestamp: {self.wall_time:.6f}\r\n"
+            f"X-Capture-Time: {captured_at:.6f}\r\n"
+            f"X-Publish-Time: {published_at:.6f}\r\n"
+        ).encode("ascii")
+        # The only copy of the encoder output: header + payload + trailer in one buffer
+        self.part = b"".join((header, b"\r\n", payload, b"\r\n"))
+        view = memoryview(self.part)
+        self.head = view[:len(header)]
+        self.body = view[len(header):]
+        self.jpeg = view[len(header) + 2:len(header) + 2 + payload.nbytes]
+        self.seq = seq
+        self.captured_at = captured_at
+        self.published_at = published_at
+
+
+DEFAULT_VARIANT = "full"
+
+
+class _FrameChannel:
+    """
+    Latest published frame of one stream variant, with its own sequence,
+    waiters and demand. The main stream is the `full` channel; additional
+    channels are resized / re-compressed variants.
+    """
+
+    def __init__(self, name: str, width: Optional[int] = None, height: Optional[int] = None,
+                 quality: Optional[int] = None) -> None:
+        self.name = name
+        self.width = width
+        self.height = height
+        self.quality = quality
+        self.latest: Optional[_PublishedFrame] = None
+        self.seq = 0
+        self.capture_seq = 0  # capture sequence of the latest frame (keeps pipelined output in order)
+        self.lock = threading.Lock()
+        # Event-loop side: one future per frame, replaced on every publish
+        self.waiter: Optional[asyncio.Future] = None
+        # Demand (guarded by CameraStreamer._demand_lock)
+        self.subscribers = 0
+        self.last_demand = 0.0
+        self.encode_ms = 0.0
+
+    def publish(self, jpeg_buffer, captured_at: float) -> _PublishedFrame:
+        with self.lock:
+            self.seq += 1
+            self.latest = _PublishedFrame(self.seq, jpeg_buffer, captured_at, time.monotonic())
+            return self.latest
+
+    def get_latest(self) -> Optional[_PublishedFrame]:
+        with self.lock:
+            return self.latest
+
+    def clear(self) -> None:
+        with self.lock:
+            self.latest = None
+
+    def stats(self) -> dict:
+        return {
+            "width": self.width,
+            "height": self.height,
+            "quality": self.quality,
+            "subscribers": self.subscribers,
+            "frames_published": self.seq,
+            "encode_ms": round(self.encode_ms, 3),
+        }
+
+
+class _StreamClientStats:
+    """Per-connection delivery counters for `/camera.mjpg`, reported on `/health`."""
+
+    def __init__(self, peer) -> None:
+        self.peer = peer
+        self.connected_at = time.monotonic()
+        self.delivered = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.fps = 0.0
+        self._window_start = self.connected_at
+        self._window_delivered = 0
+
+    def record_delivery(self, nbytes: int) -> None:
+        self.delivered += 1
+        self.bytes_sent += nbytes
+        self._window_delivered += 1
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self.fps = self._window_delivered / (now - self._window_start)
+            self._window_start = now
+            self._window_delivered = 0
+
+    def as_dict(self, buffered_bytes: int) -> dict:
+        return {
+            "peer": str(self.peer),
+            "connected_sec": round(time.monotonic() - self.connected_at, 1),
+            "delivered_fps": round(self.fps, 2),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "bytes_sent": self.bytes_sent,
+            "buffered_bytes": buffered_bytes,
+        }
+
 
 class CameraStreamer:
     """
@@ -13,10 +147,68 @@ class CameraStreamer:
     - Exposes two HTTP endpoints via aiohttp when started:
       - `/camera.mjpg`: continuous multipart/x-mixed-replace MJPEG stream
       - `/snapshot.jpg`: single JPEG snapshot
+    - Each encoded frame is published once with a sequence number; stream
+      clients await the next sequence instead of polling, so every client gets
+      every new frame exactly once, as soon as it is published.
+    - With `jpeg_passthrough`, a camera that delivers MJPEG has its compressed
+      frames forwarded as-is (no decode + re-encode); pixels are only decoded
+      on demand via `get_latest_frame()`. Devices that cannot deliver MJPEG
+      fall back to OpenCV decode + `cv2.imencode`.
+    - Capture is demand-driven: with no stream subscribers and no snapshot
+      request for `idle_timeout_sec`, the device is either released
+      (`idle_mode="release"`) or read at `keepwarm_fps` (`idle_mode="keepwarm"`).
+      A new client wakes capture immediately; stale buffered frames are
+      discarded on resume.
+    - With `encoder_workers` > 1 (and no passthrough) capture is pipelined:
+      the capture thread only reads frames into a bounded queue, a pool of
+      encoder threads runs `cv2.imencode` in parallel (it releases the GIL),
+      and publishing keeps capture order by dropping any frame that finishes
+      after a newer one was already published. Per-stage timings are on
+      `/health`.
+    - Stream writes are backpressure-aware: a frame is only written to a
+      client whose previous frame has fully left the transport buffer;
+      otherwise it is skipped and the client gets the newest frame once its
+      socket drains. A slow viewer sees a lower frame rate instead of growing
+      latency. Per-client FPS, drops and bytes are on `/health`.
+    - Each frame's multipart part is built once at publish time (straight from
+      the encoder buffer, no `tobytes()`) and written to every client as a
+      memoryview, so adding viewers adds no per-frame copies.
+    - Named `variants` ({name: {"width", "height", "quality"}}) are selected
+      with `?variant=<name>` on `/camera.mjpg` and `/snapshot.jpg`. A variant is
+      only encoded while it has a stream subscriber or a recent snapshot
+      request, and variants of the same size share one resize per frame.
+    - Optional motion gate (`motion_gate`): each frame is reduced to a small
+      grayscale thumbnail and compared with the last frame sent; if less than
+      `motion_threshold` of its pixels changed noticeably, the frame is neither
+      encoded nor sent. A frame is still forced through every
+      `motion_keyframe_sec`, when a stream client connects, and for a
+      snapshot when the latest frame is older than `_max_frame_age()`.
+    - Optional replay buffer (`ring_buffer_bytes`): the most recent encoded
+      frames are kept, evicted by total size, and `/clip.mjpg?seconds=N`
+      replays them (paced like the original, or all at once as a multipart
+      download with `download=1`) without re-encoding. It records what is
+      published: the full-size frame, or while only variants are watched the
+      largest of them. `ring_buffer_full_size` keeps the full-size rendition
+      encoded for the buffer at all times instead (costs an encode per frame).
+    - Snapshots carry an ETag built from the frame sequence and answer a
+      matching `If-None-Match` with 304. With `?wait=1` a snapshot request
+      long-polls for the next frame (up to `timeout` seconds) instead of
+      returning the one the client already has.
+    - Optional shared-memory frame bus (`frame_bus_name`): while a local
+      `FrameBusReader` is attached, every captured frame is copied raw into a
+      shared-memory ring (decoded first in passthrough mode), and an attached
+      reader keeps capture from idling.
+    - Every frame carries monotonic capture and publish (encode done) times;
+      stream parts and snapshots send them as `X-Capture-Time` /
+      `X-Publish-Time` headers plus the client's own `X-Send-Time`, and
+      `/health` has capture-to-publish, publish-to-write and capture-to-write
+      percentiles.
 
     Lifecycle:
       - Call `await start(host, port)` to start the HTTP server and the capture thread
       - Call `await stop()` to stop the server and release the camera
+      - Under `CameraManager`: `await start_capture()`, `add_routes(app, prefix)`
+        on a shared aiohttp app, and `stop_capture()`
     """
 
     def __init__(
@@ -26,28 +218,138 @@ class CameraStreamer:
         frame_height: int = 480,
         target_fps: int = 20,
         jpeg_quality: int = 80,
+        jpeg_passthrough: bool = False,
+        idle_timeout_sec: float = 0.0,
+        idle_mode: str = "release",
+        keepwarm_fps: float = 1.0,
+        encoder_workers: int = 1,
+        client_sndbuf_bytes: int = 131072,
+        variants: Optional[dict] = None,
+        motion_gate: bool = False,
+        motion_threshold: float = 0.01,
+        motion_keyframe_sec: float = 2.0,
+        ring_buffer_bytes: int = 0,
+        ring_buffer_full_size: bool = False,
+        frame_bus_name: Optional[str] = None,
+        frame_bus_slots: int = 4,
+        camera_device: Optional[str] = None,
+        name: str = "camera",
         debug: bool = False,
     ) -> None:
+        self.name = name
         self.camera_index = camera_index
+        # Preferred device: /dev/v4l/by-id link, /dev/video path or part of the camera name
+        self.camera_device = camera_device or None
         self.frame_width = frame_width
         self.frame_height = frame_height
         self.target_fps = max(1, target_fps)
         self.jpeg_quality = max(1, min(100, jpeg_quality))
+        self.jpeg_passthrough = jpeg_passthrough
+        self.idle_timeout_sec = max(0.0, float(idle_timeout_sec))  # 0 = always capture
+        self.idle_mode = idle_mode if idle_mode in ("release", "keepwarm") else "release"
+        self.keepwarm_fps = max(0.1, float(keepwarm_fps))
+        self.encoder_workers = max(1, int(encoder_workers))
+        # Kernel send buffer for stream sockets (0 = OS default); a small one keeps
+        # stale frames from queueing in the kernel on slow links
+        self.client_sndbuf_bytes = max(0, int(client_sndbuf_bytes))
+        self.motion_gate = motion_gate
+        self.motion_threshold = max(0.0, float(motion_threshold))  # fraction of thumbnail pixels
+        self.motion_keyframe_sec = max(0.1, float(motion_keyframe_sec))
+        # Byte budget of the replay buffer (0 = no replay buffer)
+        self._frame_ring: Optional[FrameRing] = FrameRing(ring_buffer_bytes) if ring_buffer_bytes > 0 else None
+        self.ring_buffer_full_size = ring_buffer_full_size
+        # Raw frames for local vision processes (None = no frame bus)
+        self._frame_bus: Optional[FrameBusWriter] = FrameBusWriter(frame_bus_name, frame_bus_slots) if frame_bus_name else None
         self.debug = debug
 
         self._cv2 = None  # Lazy import cv2
         self._cap = None
         self._capture_thread: Optional[threading.Thread] = None
         self._capture_stop = threading.Event()
-        self._latest_jpeg_bytes: Optional[bytes] = None
-        self._latest_lock = threading.Lock()
+        # Published frames per variant; `full` is the main stream
+        self._main_channel = _FrameChannel(DEFAULT_VARIANT)
+        self._channels = {DEFAULT_VARIANT: self._main_channel}
+        for name, spec in (variants or {}).items():
+            if name == DEFAULT_VARIANT or not isinstance(spec, dict):
+                continue
+            quality = spec.get("quality")
+            self._channels[name] = _FrameChannel(
+                name,
+                width=spec.get("width"),
+                height=spec.get("height"),
+                quality=max(1, min(100, int(quality))) if quality is not None else None,
+            )
+        # A variant stays encoded this long after its last snapshot request
+        self._variant_linger_sec = 5.0
+        # True while the open device hands us raw MJPEG buffers (passthrough mode)
+        self._passthrough_active = False
+        # Lazily decoded copy of the latest frame, keyed by sequence
+        self._decoded_seq: int = -1
+        self._decoded_frame = None
+        self._decode_lock = threading.Lock()
+
+        # Demand tracking (stream subscribers + recent snapshot requests, per channel)
+        self._main_channel.last_demand = time.monotonic()
+        self._demand_lock = threading.Lock()
+        self._demand_event = threading.Event()
+        self._capture_state: str = "active"  # active | keepwarm | released
+
+        # Pipelined encoding (encoder_workers > 1)
+        self._encode_queue: Optional[queue.Queue] = None
+        self._encoder_threads = []
+        self._capture_seq: int = 0
+        self._published_capture_seq: int = 0
+        self._publish_order_lock = threading.Lock()
+        self._stage_ms = {"read": 0.0, "queue_wait": 0.0, "encode": 0.0}
+        self._pipeline_counters = {"captured": 0, "dropped_queue_full": 0, "dropped_late": 0}
+
+        # Motion gate state
+        self._motion_thumb_size = (64, 48)
+        self._motion_pixel_delta = 12  # per-pixel gray difference that counts as a change
+        self._motion_reference = None  # int16 thumbnail of the last frame sent
+        self._motion_last_sent = 0.0
+        self._force_keyframe = True
+        self._motion_counters = {"passed": 0, "gated": 0, "keyframes": 0, "last_changed_fraction": 0.0}
+
+        # Resource accounting (read by CameraManager): thread CPU seconds per
+        # capture/encoder thread, bytes written to clients, frames read
+        self._thread_cpu_sec = {}
+        self._bytes_sent = 0
+        self._frames_read = 0
+        # Frame age at each pipeline step (monotonic clock), see health()
+        self._latency = {
+            "capture_to_publish": LatencyHistogram(),
+            "publish_to_write": LatencyHistogram(),
+            "capture_to_write": LatencyHistogram(),
+        }
+
+        # Frame rate cap below target_fps, set by CameraManager when over budget
+        self._fps_limit: Optional[float] = None
+
+        # Connected stream clients: id -> (_StreamClientStats, transport)
+        self._stream_clients = {}
+
+        # Distinguishes ETags across restarts (sequence numbers start over)
+        self._etag_prefix = f"{int(time.time()):x}"
+
+        # New-frame notification: capture thread -> event loop (see _FrameChannel.waiter)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
         # Capture robustness settings
         self._reopen_after_failures: int = 30
         self._consecutive_read_failures: int = 0
         self._warmup_frames: int = 5
         self._warmup_remaining: int = 0
-        # Try primary index then fallbacks 0..3
+        # Device discovery: identity of the device in use and its negotiated format
+        self._last_identity: Optional[str] = None
+        self._device_path: Optional[str] = None
+        self._format_cache = {}
+        # Enumeration is cheap, so poll for a replugged camera more often than a blind sweep;
+        # the interval doubles per failed attempt up to the maximum while it stays missing
+        self._open_retry_sec = 0.25 if os.path.isdir("/sys/class/video4linux") else 1.0
+        self._open_retry_max_sec = 10.0
+        self._open_failures = 0
+        # Without V4L2 sysfs: try primary index then fallbacks 0..3
         self._candidate_indices = []
         for idx in [self.camera_index, 0, 1, 2, 3]:
             if idx not in self._candidate_indices and isinstance(idx, int) and idx >= 0:
@@ -70,15 +372,32 @@ class CameraStreamer:
         self._cv2 = cv2
         return True
 
+    def _capture_candidates(self) -> list:
+        """(index, identity, device path) to try, from device enumeration when available."""
+        try:
+            devices = list_video_devices()
+        except Exception:
+            logging.exception("Camera enumeration failed")
+            devices = []
+        if devices or os.path.isdir("/sys/class/video4linux"):
+            ordered = order_capture_devices(devices, self.camera_device, self._last_identity, self.camera_index)
+            return [(device.index, device.identity, device.path) for device in ordered]
+        # No V4L2 sysfs (not Linux): blind index sweep
+        return [(idx, None, None) for idx in self._candidate_indices]
+
     def _open_capture(self) -> bool:
         if not self._ensure_cv2():
             return False
         try:
             api_preference = getattr(self._cv2, "CAP_V4L2", 0)
             last_error = None
-            for idx in self._candidate_indices:
+            candidates = self._capture_candidates()
+            if not candidates:
+                last_error = "No video capture device found"
+            for idx, identity, device_path in candidates:
                 try:
-                    logging.info("Attempting to open camera index %s", idx)
+                    cached = self._format_cache.get(identity) if identity else None
+                    logging.info("Attempting to open camera index %s%s", idx, f" ({identity})" if identity else "")
                     # Open with V4L2 if available
                     try:
                         if api_preference:
@@ -91,10 +410,12 @@ class CameraStreamer:
                         last_error = f"Failed to open device {idx}"
                         self._close_capture()
                         continue
-                    # Configure requested settings
-                    self._cap.set(self._cv2.CAP_PROP_FRAME_WIDTH, float(self.frame_width))
-                    self._cap.set(self._cv2.CAP_PROP_FRAME_HEIGHT, float(self.frame_height))
-                    self._cap.set(self._cv2.CAP_PROP_FPS, float(self.target_fps))
+                    # Configure requested settings (or the format this device negotiated last time)
+                    width, height, fps = (cached["width"], cached["height"], cached["fps"]) if cached else (
+                        self.frame_width, self.frame_height, self.target_fps)
+                    self._cap.set(self._cv2.CAP_PROP_FRAME_WIDTH, float(width))
+                    self._cap.set(self._cv2.CAP_PROP_FRAME_HEIGHT, float(height))
+                    self._cap.set(self._cv2.CAP_PROP_FPS, float(fps))
                     if hasattr(self._cv2, "CAP_PROP_BUFFERSIZE"):
                         try:
                             self._cap.set(self._cv2.CAP_PROP_BUFFERSIZE, 2.0)
@@ -102,21 +423,42 @@ class CameraStreamer:
                             pass
                     try:
                         fourcc_mjpg = self._cv2.VideoWriter_fourcc(*"MJPG")
-                        self._cap.set(self._cv2.CAP_PROP_FOURCC, float(fourcc_mjpg))
+                        if cached is None or cached["fourcc"] == fourcc_mjpg:
+                            self._cap.set(self._cv2.CAP_PROP_FOURCC, float(fourcc_mjpg))
                     except Exception:
                         pass
-                    # Test reads to validate device actually delivers frames
+                    self._passthrough_active = False
+                    if self.jpeg_passthrough and hasattr(self._cv2, "CAP_PROP_CONVERT_RGB") and (
+                            cached is None or cached["passthrough"]):
+                        # Ask the backend for the undecoded MJPEG buffer
+                        try:
+                            self._cap.set(self._cv2.CAP_PROP_CONVERT_RGB, 0.0)
+                            self._passthrough_active = True
+                        except Exception:
+                            pass
+                    # Test reads to validate device actually delivers frames; a node from
+                    # enumeration is known to be a capture device, so fail fast on it
                     test_ok = False
-                    for _ in range(5):
+                    test_frame = None
+                    attempts, pause = (2, 0.01) if identity else (5, 0.05)
+                    for _ in range(attempts):
                         ok, test_frame = self._cap.read()
                         if ok and test_frame is not None:
                             test_ok = True
                             break
-                        time.sleep(0.05)
+                        time.sleep(pause)
                     if not test_ok:
                         last_error = f"Device {idx} opened but did not produce frames"
                         self._close_capture()
                         continue
+                    if self._passthrough_active and not self._is_jpeg_buffer(test_frame):
+                        # Device does not deliver MJPEG: decode + re-encode instead
+                        logging.info("Camera index %s does not deliver MJPEG; JPEG passthrough disabled", idx)
+                        self._passthrough_active = False
+                        try:
+                            self._cap.set(self._cv2.CAP_PROP_CONVERT_RGB, 1.0)
+                        except Exception:
+                            pass
                     # Log negotiated settings and accept this index
                     try:
                         negotiated_w = int(self._cap.get(self._cv2.CAP_PROP_FRAME_WIDTH) or 0)
@@ -125,16 +467,27 @@ class CameraStreamer:
                         fourcc_val = int(self._cap.get(self._cv2.CAP_PROP_FOURCC) or 0)
                         fourcc_str = "".join([chr((fourcc_val >> (8 * i)) & 0xFF) for i in range(4)])
                         logging.info(
-                            "Camera ready: index=%s, %sx%s @ %.2ffps, fourcc=%s",
+                            "Camera ready: index=%s, %sx%s @ %.2ffps, fourcc=%s, passthrough=%s",
                             idx,
                             negotiated_w,
                             negotiated_h,
                             negotiated_fps,
                             fourcc_str,
+                            self._passthrough_active,
                         )
+                        if identity and negotiated_w and negotiated_h:
+                            self._format_cache[identity] = {
+                                "width": negotiated_w,
+                                "height": negotiated_h,
+                                "fps": negotiated_fps or self.target_fps,
+                                "fourcc": fourcc_val,
+                                "passthrough": self._passthrough_active,
+                            }
                     except Exception:
                         pass
                     self.camera_index = idx
+                    self._last_identity = identity
+                    self._device_path = device_path
                     self._consecutive_read_failures = 0
                     self._warmup_remaining = self._warmup_frames
                     if self.debug:
@@ -157,6 +510,17 @@ class CameraStreamer:
             logging.exception("Exception while opening camera device")
             return False
 
+    @staticmethod
+    def _is_jpeg_buffer(frame) -> bool:
+        # Raw MJPEG comes back as a flat uint8 buffer starting with the JPEG SOI marker
+        try:
+            if frame is None or frame.size < 4 or (frame.ndim == 3 and frame.shape[2] == 3):
+                return False
+            flat = frame.reshape(-1)
+            return int(flat[0]) == 0xFF and int(flat[1]) == 0xD8
+        except Exception:
+            return False
+
     def _close_capture(self) -> None:
         try:
             if self._cap is not None:
@@ -165,121 +529,579 @@ class CameraStreamer:
             pass
         self._cap = None
 
+    def _acquire_subscriber(self, channel: _FrameChannel) -> None:
+        with self._demand_lock:
+            channel.subscribers += 1
+            channel.last_demand = time.monotonic()
+        self._force_keyframe = True
+        self._demand_event.set()
+
+    def _release_subscriber(self, channel: _FrameChannel) -> None:
+        with self._demand_lock:
+            channel.subscribers = max(0, channel.subscribers - 1)
+            channel.last_demand = time.monotonic()
+
+    def _touch_demand(self, channel: _FrameChannel) -> None:
+        with self._demand_lock:
+            channel.last_demand = time.monotonic()
+        self._demand_event.set()
+
+    def _subscriber_count(self) -> int:
+        with self._demand_lock:
+            return sum(channel.subscribers for channel in self._channels.values())
+
+    def _is_idle(self) -> bool:
+        if self.idle_timeout_sec <= 0:
+            return False
+        if self._frame_bus is not None and self._frame_bus.has_readers():
+            return False
+        now = time.monotonic()
+        with self._demand_lock:
+            return all(
+                channel.subscribers == 0 and now - channel.last_demand > self.idle_timeout_sec
+                for channel in self._channels.values()
+            )
+
+    def _variant_is_wanted(self, channel: _FrameChannel, now: float) -> bool:
+        with self._demand_lock:
+            return channel.subscribers > 0 or now - channel.last_demand < self._variant_linger_sec
+
+    def _encode_variants(self, frame, jpeg_buffer, captured_at: float, capture_seq: int = 0,
+                         record: bool = False) -> None:
+        """
+        Encode every variant that currently has demand from this frame.
+        `frame` is the BGR capture; in passthrough mode it is None and the
+        camera JPEG is decoded once (reduced-size decode when all wanted
+        variants are small enough). With `record` (no full-size frame was
+        published for this capture) the largest variant goes to the replay buffer.
+        """
+        if len(self._channels) == 1:
+            return
+        now = time.monotonic()
+        wanted = [ch for name, ch in self._channels.items() if name != DEFAULT_VARIANT and self._variant_is_wanted(ch, now)]
+        if not wanted:
+            return
+        cv2 = self._cv2
+        if frame is None:
+            import numpy as np  # type: ignore
+            max_w = max((ch.width or self.frame_width) for ch in wanted)
+            reduce_flag = cv2.IMREAD_COLOR
+            for factor, flag_name in ((8, "IMREAD_REDUCED_COLOR_8"), (4, "IMREAD_REDUCED_COLOR_4"), (2, "IMREAD_REDUCED_COLOR_2")):
+                if self.frame_width // factor >= max_w and hasattr(cv2, flag_name):
+                    reduce_flag = getattr(cv2, flag_name)
+                    break
+            frame = cv2.imdecode(np.frombuffer(memoryview(jpeg_buffer).cast("B"), dtype=np.uint8), reduce_flag)
+            if frame is None:
+                return
+        resized = {}  # (w, h) -> image, shared by variants of the same size
+        largest = max(wanted, key=lambda ch: (ch.width or self.frame_width) * (ch.height or self.frame_height))
+        for channel in wanted:
+            src_h, src_w = frame.shape[:2]
+            size = (channel.width or src_w, channel.height or src_h)
+            image = resized.get(size)
+            if image is None:
+                image = frame if size == (src_w, src_h) else cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                resized[size] = image
+            encode_start = time.monotonic()
+            quality = channel.quality if channel.quality is not None else self.jpeg_quality
+            ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            channel.encode_ms += 0.1 * ((time.monotonic() - encode_start) * 1000.0 - channel.encode_ms)
+            if not ok:
+                continue
+            with channel.lock:
+                if capture_seq and capture_seq <= channel.capture_seq:
+                    continue
+                channel.capture_seq = capture_seq
+            published = self._publish_jpeg(channel, buf, captured_at)
+            if record and channel is largest and self._frame_ring is not None:
+                self._frame_ring.append(published)
+
+    def _set_capture_state(self, state: str) -> None:
+        if state == self._capture_state:
+            return
+        logging.info("Camera capture %s -> %s", self._capture_state, state)
+        if state == "active" and self._capture_state == "keepwarm" and self._cap is not None:
+            # Frames queued in the driver while idling are old: drop them
+            for _ in range(2):
+                try:
+                    self._cap.grab()
+                except Exception:
+                    break
+        self._capture_state = state
+
     def _capture_loop(self) -> None:
         assert self._cv2 is not None
-        frame_interval_s = 1.0 / float(self.target_fps)
         encode_params = [self._cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
         while not self._capture_stop.is_set():
-            start = time.time()
+            start = time.monotonic()
+            frame_interval_s = 1.0 / self.effective_fps()
             try:
+                if self._is_idle():
+                    if self.idle_mode == "release":
+                        if self._capture_state != "released":
+                            self._set_capture_state("released")
+                            self._close_capture()
+                            # The last frame would be stale by the time anyone asks again
+                            for channel in self._channels.values():
+                                channel.clear()
+                        frame_interval_s = 0.0
+                        self._demand_event.wait(timeout=1.0)
+                        self._demand_event.clear()
+                        continue
+                    self._set_capture_state("keepwarm")
+                    frame_interval_s = 1.0 / self.keepwarm_fps
+                else:
+                    self._set_capture_state("active")
                 if self._cap is None:
                     if not self._open_capture():
-                        time.sleep(1.0)
+                        self._open_failures += 1
+                        delay = self._open_retry_sec * 2 ** min(self._open_failures - 1, 8)
+                        self._capture_stop.wait(timeout=min(self._open_retry_max_sec, delay))
                         continue
+                    self._open_failures = 0
                 ok, frame = self._cap.read()
                 if not ok or frame is None:
                     self._consecutive_read_failures += 1
                     if self.debug:
                         logging.warning("Camera read failed (%s)", self._consecutive_read_failures)
-                    if self._consecutive_read_failures >= self._reopen_after_failures:
-                        logging.warning("Too many camera read failures; reopening device")
+                    unplugged = self._device_path is not None and not os.path.exists(self._device_path)
+                    if unplugged or self._consecutive_read_failures >= self._reopen_after_failures:
+                        if unplugged:
+                            logging.warning("Camera device %s disappeared; reopening", self._device_path)
+                        else:
+                            logging.warning("Too many camera read failures; reopening device")
                         self._close_capture()
                         time.sleep(0.2)
                         continue
                     time.sleep(0.05)
                     continue
+                captured_at = time.monotonic()
+                self._record_stage("read", (captured_at - start) * 1000.0)
+                self._frames_read += 1
                 self._consecutive_read_failures = 0
                 if self._warmup_remaining > 0:
                     self._warmup_remaining -= 1
                     time.sleep(0.01)
                     continue
-                ok, buf = self._cv2.imencode(".jpg", frame, encode_params)
-                if ok:
-                    data = buf.tobytes()
-                    with self._latest_lock:
-                        self._latest_jpeg_bytes = data
-                else:
-                    if self.debug:
-                        logging.warning("JPEG encode failed")
+                if self._frame_bus is not None:
+                    self._publish_to_bus(frame, captured_at)
+                if self.motion_gate and not self._motion_check(frame):
+                    continue
+                if self._passthrough_active:
+                    # Already JPEG from the camera: forward the bytes untouched
+                    if self._is_jpeg_buffer(frame):
+                        self._publish_jpeg(self._main_channel, frame, captured_at)
+                        self._encode_variants(None, frame, captured_at)
+                    elif self.debug:
+                        logging.warning("Dropping non-JPEG buffer in passthrough mode")
+                    continue
+                self._capture_seq += 1
+                self._pipeline_counters["captured"] += 1
+                if self._encode_queue is not None:
+                    self._submit_for_encode(self._capture_seq, frame, captured_at)
+                    continue
+                self._encode_and_publish(self._capture_seq, frame, captured_at, encode_params)
             except Exception:
                 logging.exception("Error in camera capture loop")
             finally:
-                elapsed = time.time() - start
+                self._thread_cpu_sec["capture"] = time.thread_time()
+                elapsed = time.monotonic() - start
                 sleep_s = max(0.0, frame_interval_s - elapsed)
                 if sleep_s > 0:
-                    time.sleep(sleep_s)
+                    if self._capture_state == "active":
+                        # Demand only matters while idling; active pacing follows target_fps
+                        self._demand_event.clear()
+                        time.sleep(sleep_s)
+                    elif self._demand_event.wait(timeout=sleep_s):
+                        # Wakes early if a client shows up while keeping warm
+                        self._demand_event.clear()
 
-    async def start(self, host: str = "0.0.0.0", port: int = 8081) -> None:
-        if self._server_started:
+    def _publish_to_bus(self, frame, captured_at: float) -> None:
+        bus = self._frame_bus
+        # The segment is created on the first frame so readers can find it;
+        # after that frames are only copied while someone is attached
+        if bus.seq > 0 and not bus.has_readers():
             return
+        if self._passthrough_active:
+            import numpy as np  # type: ignore
+            frame = self._cv2.imdecode(np.frombuffer(memoryview(frame).cast("B"), dtype=np.uint8), self._cv2.IMREAD_COLOR)
+            if frame is None:
+                return
+        bus.publish(frame, int(captured_at * 1e9))
 
-        # Start capture thread first
+    def _motion_thumbnail(self, frame):
+        import numpy as np  # type: ignore
+        cv2 = self._cv2
+        if self._passthrough_active:
+            # Cheap 1/8-scale grayscale decode straight from the camera JPEG
+            flag = getattr(cv2, "IMREAD_REDUCED_GRAYSCALE_8", cv2.IMREAD_GRAYSCALE)
+            gray = cv2.imdecode(np.frombuffer(memoryview(frame).cast("B"), dtype=np.uint8), flag)
+            if gray is None:
+                return None
+        else:
+            # Strided subsample then a vectorized luma approximation, no full-size conversion
+            step = max(1, frame.shape[1] // (self._motion_thumb_size[0] * 2))
+            sub = frame[::step, ::step]
+            gray = (sub[..., 0].astype(np.uint16) + 2 * sub[..., 1] + sub[..., 2]) >> 2
+            gray = gray.astype(np.uint8)
+        return cv2.resize(gray, self._motion_thumb_size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _motion_check(self, frame) -> bool:
+        """True if the frame should be encoded and sent (changed enough, keyframe due, or forced)."""
+        import numpy as np  # type: ignore
+        thumb = self._motion_thumbnail(frame)
+        if thumb is None:
+            return True
+        now = time.monotonic()
+        reference = self._motion_reference
+        if reference is None or self._force_keyframe or now - self._motion_last_sent >= self.motion_keyframe_sec:
+            self._force_keyframe = False
+            self._motion_counters["keyframes"] += 1
+        else:
+            changed = np.count_nonzero(np.abs(thumb - reference) > self._motion_pixel_delta) / float(thumb.size)
+            self._motion_counters["last_changed_fraction"] = round(changed, 4)
+            if changed < self.motion_threshold:
+                self._motion_counters["gated"] += 1
+                return False
+        self._motion_reference = thumb
+        self._motion_last_sent = now
+        self._motion_counters["passed"] += 1
+        return True
+
+    def _record_stage(self, stage: str, elapsed_ms: float) -> None:
+        # EWMA per pipeline stage
+        self._stage_ms[stage] += 0.1 * (elapsed_ms - self._stage_ms[stage])
+
+    def _encode_and_publish(self, capture_seq: int, frame, captured_at: float, encode_params) -> None:
+        buf = None
+        # With variants configured, the full-size rendition is only encoded while someone
+        # wants it (or the replay buffer is set to always record it)
+        if (len(self._channels) == 1 or (self.ring_buffer_full_size and self._frame_ring is not None)
+                or self._variant_is_wanted(self._main_channel, time.monotonic())):
+            encode_start = time.monotonic()
+            ok, buf = self._cv2.imencode(".jpg", frame, encode_params)
+            self._record_stage("encode", (time.monotonic() - encode_start) * 1000.0)
+            if not ok:
+                if self.debug:
+                    logging.warning("JPEG encode failed")
+                return
+        with self._publish_order_lock:
+            if capture_seq <= self._published_capture_seq:
+                # A newer frame is already out: publishing this one would go back in time
+                self._pipeline_counters["dropped_late"] += 1
+                return
+            self._published_capture_seq = capture_seq
+            if buf is not None:
+                self._publish_jpeg(self._main_channel, buf, captured_at)
+        self._encode_variants(frame, None, captured_at, capture_seq, record=buf is None)
+
+    def _submit_for_encode(self, capture_seq: int, frame, captured_at: float) -> None:
+        item = (capture_seq, frame, captured_at, time.monotonic())
+        try:
+            self._encode_queue.put_nowait(item)
+        except queue.Full:
+            # Encoders are behind: drop the oldest queued frame, keep the newest
+            try:
+                self._encode_queue.get_nowait()
+                self._pipeline_counters["dropped_queue_full"] += 1
+            except queue.Empty:
+                pass
+            try:
+                self._encode_queue.put_nowait(item)
+            except queue.Full:
+                self._pipeline_counters["dropped_queue_full"] += 1
+
+    def _encoder_loop(self) -> None:
+        encode_params = [self._cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
+        thread_key = threading.current_thread().name
+        while True:
+            item = self._encode_queue.get()
+            if item is None:
+                return
+            capture_seq, frame, captured_at, queued_at = item
+            self._record_stage("queue_wait", (time.monotonic() - queued_at) * 1000.0)
+            try:
+                self._encode_and_publish(capture_seq, frame, captured_at, encode_params)
+            except Exception:
+                logging.exception("Error in camera encoder worker")
+            self._thread_cpu_sec[thread_key] = time.thread_time()
+
+    def _start_encoders(self) -> None:
+        if self.encoder_workers <= 1:
+            return
+        self._encode_queue = queue.Queue(maxsize=self.encoder_workers * 2)
+        self._encoder_threads = []
+        for i in range(self.encoder_workers):
+            t = threading.Thread(target=self._encoder_loop, name=f"CameraEncoderThread-{self.name}-{i}", daemon=True)
+            t.start()
+            self._encoder_threads.append(t)
+
+    def _stop_encoders(self) -> None:
+        if self._encode_queue is None:
+            return
+        for _ in self._encoder_threads:
+            try:
+                self._encode_queue.put(None, timeout=0.5)
+            except queue.Full:
+                pass
+        for t in self._encoder_threads:
+            t.join(timeout=1.0)
+        self._encoder_threads = []
+        self._encode_queue = None
+
+    def _stream_client_stats(self) -> list:
+        stats = []
+        for client, transport in list(self._stream_clients.values()):
+            try:
+                buffered = transport.get_write_buffer_size() if transport is not None else 0
+            except Exception:
+                buffered = 0
+            stats.append(client.as_dict(buffered))
+        return stats
+
+    def _pipeline_stats(self) -> dict:
+        stats = {
+            "encoder_workers": self.encoder_workers,
+            "stage_ms": {k: round(v, 3) for k, v in self._stage_ms.items()},
+        }
+        stats.update(self._pipeline_counters)
+        if self._encode_queue is not None:
+            stats["queue_depth"] = self._encode_queue.qsize()
+        return stats
+
+    async def start_capture(self) -> None:
+        """Start the capture (and encoder) threads; `start()` also serves HTTP, `CameraManager` serves it itself."""
+        if self._capture_thread is not None:
+            return
         if not self._ensure_cv2():
             raise RuntimeError("cv2 not available; cannot start CameraStreamer")
+        self._loop = asyncio.get_running_loop()
+        for channel in self._channels.values():
+            channel.waiter = self._loop.create_future()
         self._capture_stop.clear()
+        self._start_encoders()
         self._capture_thread = threading.Thread(
-            target=self._capture_loop, name="CameraCaptureThread", daemon=True
+            target=self._capture_loop, name=f"CameraCaptureThread-{self.name}", daemon=True
         )
         self._capture_thread.start()
 
-        # Start aiohttp server
-        try:
-            from aiohttp import web  # type: ignore
-        except Exception as e:
-            logging.error("aiohttp is required for CameraStreamer HTTP server but failed to import: %s", e)
-            raise
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "has_frame": self._get_latest_jpeg() is not None,
+            "jpeg_passthrough": self._passthrough_active,
+            "subscribers": self._subscriber_count(),
+            "capture_state": self._capture_state,
+            "fps_limit": self._fps_limit,
+            "pipeline": self._pipeline_stats(),
+            "clients": self._stream_client_stats(),
+            "variants": {name: ch.stats() for name, ch in self._channels.items()},
+            "motion_gate": dict(self._motion_counters, enabled=self.motion_gate),
+            "ring_buffer": self._frame_ring.stats() if self._frame_ring is not None else None,
+            "frame_bus": self._frame_bus.stats() if self._frame_bus is not None else None,
+            "latency": {stage: histogram.snapshot() for stage, histogram in self._latency.items()},
+        }
+
+    def add_routes(self, app, prefix: str = "", health: bool = True) -> None:
+        """Register this camera's endpoints on an aiohttp application, under `prefix` (e.g. `/front`)."""
+        from aiohttp import web  # type: ignore
+
+        def _channel_for(request: "web.Request") -> Optional[_FrameChannel]:
+            return self._channels.get(request.query.get("variant", DEFAULT_VARIANT))
 
-        async def snapshot_handler(_: "web.Request") -> "web.Response":
-            content = self._get_latest_jpeg()
-            if content is None:
+        async def snapshot_handler(request: "web.Request") -> "web.Response":
+            channel = _channel_for(request)
+            if channel is None:
+                return web.Response(status=404, text="Unknown variant")
+            self._touch_demand(channel)
+            published = channel.get_latest()
+            seq = published.seq if published is not None else -1
+            if_none_match = request.headers.get("If-None-Match", "")
+            if if_none_match.strip() == "*":
+                client_seq = seq if published is not None else None  # any current frame matches
+            else:
+                client_seq = self._parse_etag(channel, if_none_match)
+            if request.query.get("wait", "0") not in ("0", "", "false"):
+                # Long-poll: hold the request until a frame newer than the client's arrives
+                try:
+                    timeout = min(30.0, max(0.0, float(request.query.get("timeout", "5"))))
+                except ValueError:
+                    return web.Response(status=400, text="Invalid timeout")
+                after_seq = client_seq if client_seq is not None else seq
+                try:
+                    published = await asyncio.wait_for(self._wait_for_frame(channel, after_seq), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            elif published is None or time.monotonic() - published.published_at > self._max_frame_age():
+                # Capture was idle: wait for a fresh frame rather than serve an old one
+                self._force_keyframe = True
+                try:
+                    published = await asyncio.wait_for(self._wait_for_frame(channel, seq), timeout=3.0)
+                except asyncio.TimeoutError:
+                    pass
+            if published is None:
                 logging.warning("Snapshot requested but no frame available yet")
                 return web.Response(status=503, text="No frame available")
-            return web.Response(body=content, content_type="image/jpeg")
+            headers = {
+                "ETag": self._etag(channel, published.seq),
+                "Cache-Control": "no-cache",
+                "X-Frame-Seq": str(published.seq),
+                "X-Timestamp": f"{published.wall_time:.6f}",
+                "X-Capture-Time": f"{published.captured_at:.6f}",
+                "X-Publish-Time": f"{published.published_at:.6f}",
+                "X-Send-Time": f"{time.monotonic():.6f}",
+            }
+            if client_seq == published.seq:
+                return web.Response(status=304, headers=headers)
+            self._record_write_latency(published)
+            self._bytes_sent += published.jpeg.nbytes
+            return web.Response(body=published.jpeg, content_type="image/jpeg", headers=headers)
 
-        async def mjpeg_handler(_: "web.Request") -> "web.StreamResponse":
-            boundary = "frame"
+        async def mjpeg_handler(request: "web.Request") -> "web.StreamResponse":
+            channel = _channel_for(request)
+            if channel is None:
+                return web.Response(status=404, text="Unknown variant")
             resp = web.StreamResponse(
                 status=200,
                 reason="OK",
                 headers={
-                    "Content-Type": f"multipart/x-mixed-replace; boundary={boundary}"
+                    "Content-Type": f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
                 },
             )
-            await resp.prepare(_)
+            await resp.prepare(request)
+            transport = request.transport
+            if transport is not None:
+                sock = transport.get_extra_info("socket") if self.client_sndbuf_bytes else None
+                if sock is not None:
+                    try:
+                        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.client_sndbuf_bytes)
+                    except OSError:
+                        pass
+                # Pause the protocol as soon as anything is queued, so its drain waiter
+                # fires exactly when the previous frame has been handed to the socket
+                transport.set_write_buffer_limits(high=0)
+            client = _StreamClientStats(request.remote)
+            self._stream_clients[id(client)] = (client, transport)
+            self._acquire_subscriber(channel)
+            drained = None  # pending wait for the write buffer to empty
             try:
-                # Send frames until client disconnects
+                # Send each new frame once, as soon as it is published
+                last_seq = -1
                 while True:
-                    frame = self._get_latest_jpeg()
-                    if frame is None:
-                        await asyncio.sleep(0.02)
-                        continue
-                    part = (
-                        f"--{boundary}\r\n"
-                        f"Content-Type: image/jpeg\r\n"
-                        f"Content-Length: {len(frame)}\r\n\r\n"
-                    ).encode("ascii") + frame + b"\r\n"
-                    await resp.write(part)
-                    await asyncio.sleep(1.0 / float(self.target_fps))
+                    published = await self._wait_for_frame(channel, last_seq)
+                    seq = published.seq
+                    if last_seq >= 0 and seq > last_seq + 1:
+                        # Frames published while this client was still writing
+                        client.dropped += seq - last_seq - 1
+                    last_seq = seq
+                    if transport is not None and transport.get_write_buffer_size() > 0:
+                        # Previous frame still queued: send this one once it drains,
+                        # unless a newer frame is published first (the latest wins)
+                        if drained is None or drained.done():
+                            drained = asyncio.ensure_future(request.protocol._drain_helper())
+                        if not await self._wait_for_drain(channel, drained, seq):
+                            client.dropped += 1
+                            continue
+                    # Shared, pre-framed part; only the send-time header line is per client
+                    send_header = f"X-Send-Time: {time.monotonic():.6f}\r\n".encode("ascii")
+                    await resp.write(published.head)
+                    await resp.write(send_header)
+                    await resp.write(published.body)
+                    self._record_write_latency(published)
+                    client.record_delivery(len(published.part) + len(send_header))
+                    self._bytes_sent += len(published.part) + len(send_header)
             except asyncio.CancelledError:
                 raise
             except Exception:
                 # Client disconnected or other error
                 pass
             finally:
+                if drained is not None:
+                    # Resolves (or fails) with the connection; nobody awaits it any more
+                    drained.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._stream_clients.pop(id(client), None)
+                self._release_subscriber(channel)
                 try:
                     await resp.write_eof()
                 except Exception:
                     pass
             return resp
 
+        async def clip_handler(request: "web.Request") -> "web.StreamResponse":
+            if self._frame_ring is None:
+                return web.Response(status=404, text="Replay buffer disabled")
+            try:
+                seconds = float(request.query.get("seconds", "10"))
+            except ValueError:
+                return web.Response(status=400, text="Invalid seconds")
+            download = request.query.get("download", "0") not in ("0", "", "false")
+            entries = self._frame_ring.recent(seconds)
+            if not entries:
+                return web.Response(status=404, text="No recorded frames")
+            if download:
+                content_type = f"multipart/mixed; boundary={MJPEG_BOUNDARY}"
+                headers = {
+                    "Content-Type": content_type,
+                    "Content-Disposition": f'attachment; filename="clip-{int(entries[0][1])}.multipart"',
+                }
+            else:
+                headers = {"Content-Type": f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"}
+            resp = web.StreamResponse(status=200, reason="OK", headers=headers)
+            await resp.prepare(request)
+            try:
+                first_monotonic = entries[0][0]
+                replay_start = time.monotonic()
+                for recorded_at, wall_time, frame in entries:
+                    if not download:
+                        # Keep the original frame spacing
+                        delay = (recorded_at - first_monotonic) - (time.monotonic() - replay_start)
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    header = (
+                        f"--{MJPEG_BOUNDARY}\r\n"
+                        f"Content-Type: image/jpeg\r\n"
+                        f"Content-Length: {frame.jpeg.nbytes}\r\n"
+                        f"X-Frame-Seq: {frame.seq}\r\n"
+                        f"X-Timestamp: {wall_time:.6f}\r\n\r\n"
+                    ).encode("ascii")
+                    await resp.write(header)
+                    await resp.write(frame.jpeg)
+                    await resp.write(b"\r\n")
+                if download:
+                    await resp.write(f"--{MJPEG_BOUNDARY}--\r\n".encode("ascii"))
+                await resp.write_eof()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Client disconnected
+                pass
+            return resp
+
         async def health_handler(_: "web.Request") -> "web.Response":
-            has_frame = self._get_latest_jpeg() is not None
-            return web.json_response({"status": "ok", "has_frame": has_frame})
+            return web.json_response(self.health())
+
+        app.router.add_get(f"{prefix}/snapshot.jpg", snapshot_handler)
+        app.router.add_get(f"{prefix}/camera.mjpg", mjpeg_handler)
+        app.router.add_get(f"{prefix}/clip.mjpg", clip_handler)
+        if health:
+            app.router.add_get(f"{prefix}/health", health_handler)
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8081) -> None:
+        if self._server_started:
+            return
+
+        # Start capture thread first
+        await self.start_capture()
+
+        # Start aiohttp server
+        try:
+            from aiohttp import web  # type: ignore
+        except Exception as e:
+            logging.error("aiohttp is required for CameraStreamer HTTP server but failed to import: %s", e)
+            raise
 
         app = web.Application()
-        app.router.add_get("/snapshot.jpg", snapshot_handler)
-        app.router.add_get("/camera.mjpg", mjpeg_handler)
-        app.router.add_get("/health", health_handler)
+        self.add_routes(app)
         runner = web.AppRunner(app)
         await runner.setup()
         site = web.TCPSite(runner, host, port)
@@ -302,15 +1124,129 @@ class CameraStreamer:
         self._aiohttp_runner = None
         self._server_started = False
 
-        # Stop capture thread
+        self.stop_capture()
+        logging.info("Camera stream server stopped")
+
+    def stop_capture(self) -> None:
         self._capture_stop.set()
+        self._demand_event.set()
         if self._capture_thread is not None and self._capture_thread.is_alive():
             self._capture_thread.join(timeout=2.0)
         self._capture_thread = None
+        self._stop_encoders()
         self._close_capture()
-        logging.info("Camera stream server stopped")
+        if self._frame_bus is not None:
+            self._frame_bus.close()
+
+    def _record_write_latency(self, published: _PublishedFrame) -> None:
+        now = time.monotonic()
+        self._latency["publish_to_write"].add((now - published.published_at) * 1000.0)
+        self._latency["capture_to_write"].add((now - published.captured_at) * 1000.0)
+
+    def effective_fps(self) -> float:
+        if self._fps_limit is None:
+            return float(self.target_fps)
+        return min(float(self.target_fps), self._fps_limit)
+
+    @property
+    def fps_limit(self) -> Optional[float]:
+        return self._fps_limit
+
+    def set_fps_limit(self, fps: Optional[float]) -> None:
+        """Cap the capture rate below `target_fps` (None lifts the cap)."""
+        self._fps_limit = None if fps is None or fps >= self.target_fps else max(0.5, float(fps))
+
+    def resource_usage(self) -> dict:
+        """Cumulative counters for rate calculations: thread CPU seconds, bytes sent, frames read/published."""
+        return {
+            "cpu_sec": sum(self._thread_cpu_sec.values()),
+            "bytes_sent": self._bytes_sent,
+            "frames_read": self._frames_read,
+            "frames_published": self._main_channel.seq,
+        }
+
+    def _get_latest_jpeg(self) -> Optional[memoryview]:
+        published = self._main_channel.get_latest()
+        return published.jpeg if published is not None else None
+
+    def get_latest_frame(self):
+        """
+        Latest frame as a BGR numpy array, decoded from the published JPEG on
+        first request and cached until the next frame. For consumers that need
+        pixels; the stream itself never decodes.
+        """
+        published = self._main_channel.get_latest()
+        if published is None or self._cv2 is None:
+            return None
+        seq, data = published.seq, published.jpeg
+        with self._decode_lock:
+            if self._decoded_seq != seq:
+                import numpy as np  # type: ignore
+                self._decoded_frame = self._cv2.imdecode(np.frombuffer(data, dtype=np.uint8), self._cv2.IMREAD_COLOR)
+                self._decoded_seq = seq
+            return self._decoded_frame
 
-    def _get_latest_jpeg(self) -> Optional[bytes]:
-        with self._latest_lock:
-            return self._latest_jpeg_bytes
+    def _max_frame_age(self) -> float:
+        """Age past which the latest frame means capture was idle (gated streams legitimately go quiet)."""
+        interval = 2.0 / float(self.target_fps)
+        return interval + self.motion_keyframe_sec if self.motion_gate else interval
+
+    def _etag(self, channel: _FrameChannel, seq: int) -> str:
+        return f'"{self._etag_prefix}-{channel.name}-{seq}"'
+
+    def _parse_etag(self, channel: _FrameChannel, if_none_match: str) -> Optional[int]:
+        """Frame sequence named by an `If-None-Match` header, if it is one of ours for this channel."""
+        prefix = f'"{self._etag_prefix}-{channel.name}-'
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.startswith(prefix) and tag.endswith('"'):
+                try:
+                    return int(tag[len(prefix):-1])
+                except ValueError:
+                    continue
+        return None
+
+    def _publish_jpeg(self, channel: _FrameChannel, jpeg_buffer, captured_at: float) -> _PublishedFrame:
+        # Called from the capture/encoder threads; jpeg_buffer is any bytes-like
+        # object (imencode output or the camera's MJPEG buffer)
+        published = channel.publish(jpeg_buffer, captured_at)
+        self._latency["capture_to_publish"].add((published.published_at - captured_at) * 1000.0)
+        if channel is self._main_channel and self._frame_ring is not None:
+            self._frame_ring.append(published)
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._notify_new_frame, channel)
+            except RuntimeError:
+                pass  # Loop shutting down
+        return published
+
+    def _notify_new_frame(self, channel: _FrameChannel) -> None:
+        # Runs on the event loop: wake every waiter, then arm a fresh future for the next frame
+        waiter = channel.waiter
+        channel.waiter = self._loop.create_future()
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def _wait_for_drain(self, channel: _FrameChannel, drained: asyncio.Future, seq: int) -> bool:
+        """Wait for `drained` (the client's write buffer emptied); False if a frame newer than `seq` came first."""
+        latest = channel.get_latest()
+        if latest is not None and latest.seq != seq:
+            return False
+        # asyncio.wait only watches both futures; neither is cancelled or left behind
+        await asyncio.wait([drained, channel.waiter], return_when=asyncio.FIRST_COMPLETED)
+        if drained.done():
+            drained.result()  # raises if the connection was lost
+            return True
+        return False
 
+    async def _wait_for_frame(self, channel: _FrameChannel, after_seq: int) -> _PublishedFrame:
+        """Return the first frame published on `channel` after `after_seq`."""
+        while True:
+            published = channel.get_latest()
+            if published is not None and published.seq != after_seq:
+                return published
+            # Shielded: one client going away must not cancel the shared future
+            await asyncio.shield(channel.waiter)
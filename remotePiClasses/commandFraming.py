@@ -0,0 +1,217 @@
+import logging
+import struct
+from typing import List, Optional
+
+
+class CommandFramer:
+    """
+    Reassembles newline-terminated text commands from a TCP byte stream.
+
+    - Keeps any trailing partial line between reads, so a command split across
+      TCP segments is parsed once it is complete.
+    - Accepts `\\n`, `\\r\\n` and `\\r` terminators.
+    - Drops a partial line that grows past `max_line_length` (garbage or a
+      client that never sends a terminator) instead of buffering forever.
+    """
+
+    def __init__(self, max_line_length: int = 256) -> None:
+        self.max_line_length = max_line_length
+        self._buffer = bytearray()
+        self.overflows = 0
+
+    def feed(self, data: bytes) -> List[str]:
+        self._buffer += data
+        if b"\r" in self._buffer:
+            self._buffer = bytearray(self._buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n"))
+        lines: List[str] = []
+        end = self._buffer.rfind(b"\n")
+        if end >= 0:
+            complete = bytes(self._buffer[:end])
+            del self._buffer[: end + 1]
+            for raw_line in complete.split(b"\n"):
+                line = raw_line.decode("utf-8", errors="replace").strip()
+                if line:
+                    lines.append(line)
+        if len(self._buffer) > self.max_line_length:
+            self.overflows += 1
+            logging.warning("Dropping %d bytes of unterminated command data", len(self._buffer))
+            self._buffer.clear()
+        return lines
+
+    def pending_bytes(self) -> int:
+        return len(self._buffer)
+
+
+class CommandBatch:
+    """
+    Result of coalescing one burst of command lines.
+
+    - `left` / `right`: newest value seen for each wheel in the burst, or None
+    - `others`: non-motor commands (e.g. `reset`) in arrival order
+    - `motor_commands`: number of `L:`/`R:` lines in the burst
+    - `coalesced`: number of motor lines superseded by a newer one and never sent
+    """
+
+    def __init__(self) -> None:
+        self.left: Optional[str] = None
+        self.right: Optional[str] = None
+        self.others: List[str] = []
+        self.motor_commands = 0
+        self.coalesced = 0
+
+
+def coalesce_commands(lines: List[str]) -> CommandBatch:
+    """Collapse a burst of lines to the newest left and newest right motor value (latest wins)."""
+    batch = CommandBatch()
+    for line in lines:
+        if line.startswith("L:"):
+            if batch.left is not None:
+                batch.coalesced += 1
+            batch.left = line[2:]
+            batch.motor_commands += 1
+        elif line.startswith("R:"):
+            if batch.right is not None:
+                batch.coalesced += 1
+            batch.right = line[2:]
+            batch.motor_commands += 1
+        else:
+            batch.others.append(line)
+    return batch
+
+
+# Binary control frame (little-endian, 18 bytes):
+#   magic   u8   0xA5 (never a valid first byte of a text command)
+#   flags   u8   reserved, send 0
+#   left    i16  left wheel duty, -100..100
+#   right   i16  right wheel duty, -100..100
+#   seq     u32  sender sequence number, wraps at 2**32
+#   ts_us   u64  client send time, microseconds since the Unix epoch
+BINARY_FRAME_MAGIC = 0xA5
+BINARY_FRAME_STRUCT = struct.Struct("<BBhhIQ")
+BINARY_FRAME_SIZE = BINARY_FRAME_STRUCT.size
+
+
+class BinaryFrame:
+    __slots__ = ("left", "right", "seq", "timestamp_us", "flags")
+
+    def __init__(self, left: int, right: int, seq: int, timestamp_us: int, flags: int = 0) -> None:
+        self.left = left
+        self.right = right
+        self.seq = seq
+        self.timestamp_us = timestamp_us
+        self.flags = flags
+
+
+def pack_binary_frame(left: int, right: int, seq: int, timestamp_us: int, flags: int = 0) -> bytes:
+    """Build a binary control frame (client-side helper, also handy for testing)."""
+    return BINARY_FRAME_STRUCT.pack(BINARY_FRAME_MAGIC, flags, left, right, seq & 0xFFFFFFFF, timestamp_us)
+
+
+class BinaryFrameDecoder:
+    """
+    Splits a byte stream into fixed-size binary control frames.
+
+    Keeps partial frames between reads. If the stream is out of sync (the byte
+    at a frame boundary is not the magic byte) it skips ahead to the next magic
+    byte and counts a resync.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self.resyncs = 0
+
+    def feed(self, data: bytes) -> List[BinaryFrame]:
+        self._buffer += data
+        frames: List[BinaryFrame] = []
+        offset = 0
+        size = len(self._buffer)
+        while size - offset >= BINARY_FRAME_SIZE:
+            if self._buffer[offset] != BINARY_FRAME_MAGIC:
+                next_magic = self._buffer.find(bytes((BINARY_FRAME_MAGIC,)), offset + 1)
+                self.resyncs += 1
+                offset = size if next_magic < 0 else next_magic
+                continue
+            _, flags, left, right, seq, ts_us = BINARY_FRAME_STRUCT.unpack_from(self._buffer, offset)
+            frames.append(BinaryFrame(left, right, seq, ts_us, flags))
+            offset += BINARY_FRAME_SIZE
+        del self._buffer[:offset]
+        return frames
+
+
+def is_binary_stream(first_chunk: bytes) -> bool:
+    """Protocol auto-detection: a connection is binary if its first byte is the frame magic."""
+    return bool(first_chunk) and first_chunk[0] == BINARY_FRAME_MAGIC
+
+
+class SequenceTracker:
+    """
+    Per-sender sequence filter for unreliable transports (UDP).
+
+    - `accept(seq)` returns True only for packets newer than the last accepted
+      one (u32 serial-number arithmetic, so wrap-around is handled).
+    - Gaps are counted as `lost`; a late packet from inside a gap is counted as
+      `reordered` (and no longer as lost) and rejected, as is a `duplicate`.
+    - If a sender goes quiet for `reset_after_sec` the next packet is accepted
+      whatever its number, so a restarted client is not locked out.
+    """
+
+    def __init__(self, reset_after_sec: float = 2.0) -> None:
+        self.reset_after_sec = reset_after_sec
+        self.last_seq: Optional[int] = None
+        self.last_accept_time = 0.0
+        self.received = 0
+        self.accepted = 0
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+
+    def accept(self, seq: int, now: float) -> bool:
+        self.received += 1
+        seq &= 0xFFFFFFFF
+        if self.last_seq is None or now - self.last_accept_time > self.reset_after_sec:
+            self._accept(seq, now)
+            return True
+        delta = (seq - self.last_seq) & 0xFFFFFFFF
+        if delta == 0:
+            self.duplicates += 1
+            return False
+        if delta >= 0x80000000:
+            self.reordered += 1
+            if self.lost > 0:
+                self.lost -= 1
+            return False
+        self.lost += delta - 1
+        self._accept(seq, now)
+        return True
+
+    def _accept(self, seq: int, now: float) -> None:
+        self.last_seq = seq
+        self.last_accept_time = now
+        self.accepted += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "accepted": self.accepted,
+            "lost": self.lost,
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "last_seq": self.last_seq,
+        }
+
+
+def parse_text_datagram(data: bytes):
+    """
+    Parse a text UDP datagram: first line `S:<seq>`, then ordinary command lines.
+
+    Returns `(seq, lines)` or `(None, [])` if the datagram has no valid sequence line.
+    """
+    lines = [line.strip() for line in data.decode("utf-8", errors="replace").splitlines()]
+    lines = [line for line in lines if line]
+    if not lines or not lines[0].startswith("S:"):
+        return None, []
+    try:
+        seq = int(lines[0][2:])
+    except ValueError:
+        return None, []
+    return seq, lines[1:]
@@ -1,12 +1,141 @@
 import serial
 import time
 import logging
+import threading
+from collections import deque
+from remotePiClasses.latencyStats import LatencyHistogram
+
+class HandshakeTimeout(IOError):
+    """The port opened but nothing answered `PING` in time."""
 
 class DirectionSystem:
-    def __init__(self, port='/dev/ttyACM0', baudrate=115200, debug=False):
-        self.ser = serial.Serial(port, baudrate, timeout=1)
-        time.sleep(2)  # Wait for Arduino to reset
+    """
+    Arduino motor controller over USB serial.
+
+    Writes never happen on the caller's thread: commands are queued and sent
+    by a dedicated writer thread, so a slow or stalled adapter cannot block
+    the asyncio loop. The queue is bounded; when it is full the oldest queued
+    speed update is dropped (a newer one supersedes it anyway). Control
+    commands such as STOP are never dropped.
+
+    Duty updates are delta-suppressed: a wheel whose duty has not changed is
+    not resent, except for a keepalive resend every `keepalive_sec`. With
+    `combined_frames` both wheels go out as one `D:<left>,<right>` line;
+    otherwise the `L:`/`R:` lines understood by the original firmware are
+    used (still in a single write).
+
+    A reader thread consumes everything the controller sends back:
+    - `ACK:<seq>` replies are matched to commands sent with `ack_sequence`
+      enabled (each write is tagged `#<seq>`) and feed a rolling serial
+      round-trip-time histogram
+    - `T:key=value,...` telemetry lines update `controller_state`
+    - anything else is counted and kept as `last_message`
+
+    A failed read or write marks the link as failed (`link_failed`) and calls
+    `failure_callback` once, from the I/O thread, so a supervisor can replace
+    the connection.
+    """
+
+    def __init__(self, port='/dev/ttyACM0', baudrate=115200, debug=False, queue_size=8, write_timeout=1.0,
+                 combined_frames=False, keepalive_sec=0.5, ack_sequence=False, ack_timeout_sec=2.0,
+                 handshake=False, handshake_timeout=3.0, handshake_required=True):
+        self.ser = serial.Serial(port, baudrate, timeout=1, write_timeout=write_timeout)
         self.debug = debug
+        self.port = port
+        self.firmware_info = None
+        if handshake:
+            # Identify the controller and return as soon as it is up, instead of a fixed reset delay
+            try:
+                self.firmware_info = self._handshake(handshake_timeout)
+            except HandshakeTimeout:
+                if handshake_required:
+                    self.ser.close()
+                    raise
+                # Known port, firmware without PING support: the reset is over by now
+                logging.warning(f"No handshake reply on {port}; using it without one")
+            except Exception:
+                self.ser.close()
+                raise
+        else:
+            time.sleep(2)  # Wait for Arduino to reset
+
+        # Outgoing queue of (payload, droppable, enqueue_time)
+        self.queue_size = max(1, queue_size)
+        self._write_queue = deque()
+        self._write_cond = threading.Condition()
+        self._writer_stop = False
+
+        # Writer metrics
+        self.writes = 0
+        self.write_errors = 0
+        self.dropped_updates = 0
+        self.max_queue_depth = 0
+        self.write_latency_avg_ms = 0.0
+        self.write_latency_max_ms = 0.0
+        self.last_write_error = None
+
+        # Delta suppression state
+        self.combined_frames = combined_frames
+        self.keepalive_sec = keepalive_sec
+        self._sent_left = None
+        self._sent_right = None
+        self._last_send_time = 0.0
+        self._resend_all = False
+        self.suppressed_updates = 0
+        self.keepalives = 0
+
+        # Reply / telemetry state (reader thread)
+        self.ack_sequence = ack_sequence
+        self.ack_timeout_sec = ack_timeout_sec
+        self._next_seq = 1
+        self._pending_acks = {}  # seq -> send time, oldest first
+        self._pending_lock = threading.Lock()
+        self.rtt_histogram = LatencyHistogram()
+        self.acks = 0
+        self.ack_timeouts = 0
+        self.unmatched_acks = 0
+        self.messages_received = 0
+        self.read_errors = 0
+        self.last_read_error = None
+        self.last_message = None
+        self.controller_state = {}
+        self.controller_state_time = None
+        self._reader_stop = False
+
+        # Link health
+        self.link_failed = False
+        self.failure_callback = None
+
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="MotorSerialWriter", daemon=True)
+        self._writer_thread.start()
+        self._reader_thread = threading.Thread(target=self._reader_loop, name="MotorSerialReader", daemon=True)
+        self._reader_thread.start()
+
+    def _handshake(self, timeout):
+        """
+        Send `PING` until the controller answers a line starting with `PONG`
+        (the rest of the line is kept as `firmware_info`). Keeps pinging while
+        the Arduino bootloader runs after the port open reset. Raises
+        HandshakeTimeout if nothing answers within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        next_ping = 0.0
+        previous_timeout = self.ser.timeout
+        self.ser.timeout = 0.1
+        try:
+            self.ser.reset_input_buffer()
+            while time.monotonic() < deadline:
+                if time.monotonic() >= next_ping:
+                    self.ser.write(b'PING\n')
+                    next_ping = time.monotonic() + 0.25
+                line = self.ser.readline().decode('ascii', errors='replace').strip()
+                if line.startswith('PONG'):
+                    if self.debug:
+                        logging.info(f"Motor controller handshake on {self.port}: {line}")
+                    return line[4:].strip()
+        finally:
+            self.ser.timeout = previous_timeout
+        raise HandshakeTimeout(f"no handshake reply within {timeout:.1f}s")
 
     def map_power_to_duty(self, power):
         try:
@@ -27,21 +156,230 @@ class DirectionSystem:
         if self.debug:
             logging.info(f'power left: {power}')
             logging.info(f'speed left: {speed}')
-        cmd = f'L:{speed}\n'
-        self.ser.write(cmd.encode('utf-8'))
+        self.set_duty_left(speed)
 
     def set_speed_right(self, power):
         speed = self.map_power_to_duty(power)
         if self.debug:
             logging.info(f'power right: {power}')
             logging.info(f'speed right: {speed}')
-        cmd = f'R:{speed}\n'
-        self.ser.write(cmd.encode('utf-8'))
+        self.set_duty_right(speed)
+
+    # Integer duty setters (-100..100) for callers that already have duty values,
+    # e.g. the binary control protocol; skips the string/float parsing above.
+    def set_duty_left(self, duty):
+        return self.set_duty(duty, None)
+
+    def set_duty_right(self, duty):
+        return self.set_duty(None, duty)
+
+    def set_duty(self, left, right):
+        """
+        Set both wheels (None leaves a wheel at its last sent value).
+        Returns True if a command was queued, False if it was suppressed as unchanged.
+        """
+        now = time.monotonic()
+        if self._resend_all:
+            # A queued update was dropped or a write failed: the controller state is unknown
+            self._resend_all = False
+            self._sent_left = None
+            self._sent_right = None
+        if left is not None:
+            left = max(-100, min(100, int(left)))
+        if right is not None:
+            right = max(-100, min(100, int(right)))
+        left_changed = left is not None and left != self._sent_left
+        right_changed = right is not None and right != self._sent_right
+        keepalive_due = now - self._last_send_time >= self.keepalive_sec
+        if not (left_changed or right_changed or keepalive_due):
+            self.suppressed_updates += 1
+            return False
+        if left is None:
+            left = self._sent_left
+        if right is None:
+            right = self._sent_right
+        if self.combined_frames:
+            cmd = f'D:{left or 0},{right or 0}\n'
+        else:
+            cmd = ''
+            if left is not None and (left_changed or keepalive_due):
+                cmd += f'L:{left}\n'
+            if right is not None and (right_changed or keepalive_due):
+                cmd += f'R:{right}\n'
+            if not cmd:
+                return False
+        self._enqueue(cmd.encode('utf-8'))
+        if not (left_changed or right_changed):
+            self.keepalives += 1
+        self._sent_left = left
+        self._sent_right = right
+        self._last_send_time = now
+        return True
 
     def stop(self):
-        self.ser.write(b'STOP\n')
+        self._enqueue(b'STOP\n', droppable=False)
+        self._sent_left = 0
+        self._sent_right = 0
+        self._last_send_time = time.monotonic()
+
+    def _enqueue(self, payload, droppable=True):
+        with self._write_cond:
+            if len(self._write_queue) >= self.queue_size:
+                self._drop_oldest_update()
+            self._write_queue.append((payload, droppable, time.monotonic()))
+            if len(self._write_queue) > self.max_queue_depth:
+                self.max_queue_depth = len(self._write_queue)
+            self._write_cond.notify()
+
+    def _drop_oldest_update(self):
+        # Caller holds self._write_cond
+        for i, item in enumerate(self._write_queue):
+            if item[1]:
+                del self._write_queue[i]
+                self.dropped_updates += 1
+                self._resend_all = True
+                return
+        # Only control commands queued: let the queue grow rather than lose one
+
+    def _writer_loop(self):
+        while True:
+            with self._write_cond:
+                while not self._write_queue and not self._writer_stop:
+                    self._write_cond.wait()
+                if not self._write_queue:
+                    return
+                payload, _, enqueued_at = self._write_queue.popleft()
+            if self.ack_sequence:
+                payload = self._tag_for_ack(payload)
+            try:
+                self.ser.write(payload)
+                self.writes += 1
+                latency_ms = (time.monotonic() - enqueued_at) * 1000.0
+                self.write_latency_avg_ms += 0.05 * (latency_ms - self.write_latency_avg_ms)
+                if latency_ms > self.write_latency_max_ms:
+                    self.write_latency_max_ms = latency_ms
+            except Exception as e:
+                self.write_errors += 1
+                self.last_write_error = e
+                self._resend_all = True
+                logging.warning(f"Motor serial write failed on {self.port}: {e}")
+                self._mark_failed()
+
+    def _tag_for_ack(self, payload):
+        # Tag the last line of the write with a sequence number the firmware echoes as ACK:<seq>
+        seq = self._next_seq
+        self._next_seq = (seq + 1) & 0xFFFF or 1
+        now = time.monotonic()
+        with self._pending_lock:
+            while self._pending_acks:
+                oldest_seq = next(iter(self._pending_acks))
+                if now - self._pending_acks[oldest_seq] < self.ack_timeout_sec:
+                    break
+                del self._pending_acks[oldest_seq]
+                self.ack_timeouts += 1
+            self._pending_acks[seq] = now
+        return payload.rstrip(b'\n') + f'#{seq}\n'.encode('ascii')
+
+    def _reader_loop(self):
+        while not self._reader_stop:
+            try:
+                raw = self.ser.readline()
+            except Exception as e:
+                if self._reader_stop:
+                    return
+                self.read_errors += 1
+                self.last_read_error = e
+                logging.warning(f"Motor serial read failed on {self.port}: {e}")
+                self._mark_failed()
+                time.sleep(0.5)
+                continue
+            if raw:
+                self._handle_reply(raw.decode('ascii', errors='replace').strip(), time.monotonic())
+
+    def _mark_failed(self):
+        if self.link_failed:
+            return
+        self.link_failed = True
+        callback = self.failure_callback
+        if callback is not None:
+            try:
+                callback()
+            except Exception:
+                logging.exception("Motor link failure callback raised")
+
+    def _handle_reply(self, line, now):
+        if not line:
+            return
+        self.messages_received += 1
+        if line.startswith('ACK'):
+            try:
+                seq = int(line[3:].lstrip(': '))
+            except ValueError:
+                self.unmatched_acks += 1
+                return
+            with self._pending_lock:
+                sent_at = self._pending_acks.pop(seq, None)
+            if sent_at is None:
+                self.unmatched_acks += 1
+                return
+            self.acks += 1
+            self.rtt_histogram.add((now - sent_at) * 1000.0)
+        elif line.startswith('T:'):
+            state = {}
+            for field in line[2:].replace(',', ' ').split():
+                key, sep, value = field.partition('=')
+                if not sep:
+                    continue
+                try:
+                    state[key] = float(value) if '.' in value else int(value)
+                except ValueError:
+                    state[key] = value
+            self.controller_state.update(state)
+            self.controller_state_time = now
+        else:
+            self.last_message = line
+            if self.debug:
+                logging.info(f"Motor controller says: {line}")
+
+    def queue_depth(self):
+        with self._write_cond:
+            return len(self._write_queue)
+
+    def stats(self):
+        return {
+            'port': self.port,
+            'firmware_info': self.firmware_info,
+            'link_failed': self.link_failed,
+            'queue_depth': self.queue_depth(),
+            'max_queue_depth': self.max_queue_depth,
+            'writes': self.writes,
+            'write_errors': self.write_errors,
+            'dropped_updates': self.dropped_updates,
+            'suppressed_updates': self.suppressed_updates,
+            'keepalives': self.keepalives,
+            'combined_frames': self.combined_frames,
+            'acks': self.acks,
+            'ack_timeouts': self.ack_timeouts,
+            'unmatched_acks': self.unmatched_acks,
+            'serial_rtt': self.rtt_histogram.snapshot(),
+            'messages_received': self.messages_received,
+            'read_errors': self.read_errors,
+            'last_message': self.last_message,
+            'controller_state': dict(self.controller_state),
+            'controller_state_age_sec': (
+                round(time.monotonic() - self.controller_state_time, 3)
+                if self.controller_state_time is not None else None
+            ),
+            'write_latency_avg_ms': round(self.write_latency_avg_ms, 3),
+            'write_latency_max_ms': round(self.write_latency_max_ms, 3),
+        }
 
-    def close(self):
+    def close(self, flush_timeout=1.0):
+        # Let queued commands (e.g. a final STOP) go out before closing the port
+        with self._write_cond:
+            self._writer_stop = True
+            self._write_cond.notify()
+        self._writer_thread.join(timeout=flush_timeout)
+        self._reader_stop = True
         self.ser.close()
-   
-   
\ No newline at end of file
+        self._reader_thread.join(timeout=flush_timeout)
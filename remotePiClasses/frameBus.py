@@ -0,0 +1,220 @@
+import logging
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+
+# Shared memory layout (little-endian):
+#   bus header, 64 bytes:
+#     magic u32 b"RPFB" | version u32 | slots u32 | slot_bytes u32 |
+#     latest_seq u64 | reader_heartbeat_ns u64 (monotonic, written by readers)
+#   then `slots` slots, each a 64-byte slot header followed by `slot_bytes` of pixels:
+#     seq u64 (0 while being written) | timestamp_ns u64 (monotonic capture time) |
+#     height u32 | width u32 | channels u32 | stride u32 (bytes per row)
+# time.monotonic_ns() is CLOCK_MONOTONIC on Linux, so timestamps compare across processes.
+FRAME_BUS_MAGIC = b"RPFB"
+FRAME_BUS_VERSION = 1
+BUS_HEADER = struct.Struct("<4sIIIQQ")
+BUS_HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct("<QQIIII")
+SLOT_HEADER_SIZE = 64
+_LATEST_SEQ_OFFSET = 16
+_HEARTBEAT_OFFSET = 24
+_U64 = struct.Struct("<Q")
+_created_here = set()  # names of segments this process created (and will unlink)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing segment without handing its lifetime to this process."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the segment with the resource tracker,
+        # which would unlink it when this (reader) process exits. A segment this
+        # process created stays registered: the writer's unlink() unregisters it.
+        shm = shared_memory.SharedMemory(name=name)
+        if name not in _created_here:
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+            except Exception:
+                pass
+        return shm
+
+
+class FrameBusWriter:
+    """
+    Publishes raw frames (uint8 numpy arrays) into a shared-memory ring for
+    local consumers (see `FrameBusReader`).
+
+    - The segment is created on the first `publish()`, sized from that frame;
+      a larger frame later is dropped and counted in `oversize`.
+    - Each slot is written seqlock-style: its `seq` is zeroed, the pixels and
+      metadata are copied in, then `seq` is set and the bus `latest_seq`
+      advanced. One copy per frame, whatever the number of readers.
+    - Readers refresh a heartbeat in the header; `has_readers()` lets the
+      producer skip the copy (and stay idle) when nobody is attached.
+    """
+
+    def __init__(self, name: str, slots: int = 4) -> None:
+        self.name = name
+        self.slots = max(2, int(slots))
+        self.slot_bytes = 0
+        self.seq = 0
+        self.published = 0
+        self.oversize = 0
+        self._shm: Optional[shared_memory.SharedMemory] = None
+
+    def _create(self, slot_bytes: int) -> None:
+        size = BUS_HEADER_SIZE + self.slots * (SLOT_HEADER_SIZE + slot_bytes)
+        try:
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a previous run that did not exit cleanly; a tracked
+            # attach, since unlink() below unregisters it again
+            stale = shared_memory.SharedMemory(name=self.name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        _created_here.add(self.name)
+        shm.buf[:BUS_HEADER_SIZE] = bytes(BUS_HEADER_SIZE)
+        BUS_HEADER.pack_into(shm.buf, 0, FRAME_BUS_MAGIC, FRAME_BUS_VERSION, self.slots, slot_bytes, 0, 0)
+        self._shm = shm
+        self.slot_bytes = slot_bytes
+        logging.info("Frame bus '%s' created: %d slots of %d bytes", self.name, self.slots, slot_bytes)
+
+    def has_readers(self, max_age_sec: float = 2.0) -> bool:
+        if self._shm is None:
+            return False
+        (heartbeat_ns,) = _U64.unpack_from(self._shm.buf, _HEARTBEAT_OFFSET)
+        return heartbeat_ns != 0 and time.monotonic_ns() - heartbeat_ns < max_age_sec * 1e9
+
+    def publish(self, frame, timestamp_ns: Optional[int] = None) -> bool:
+        import numpy as np  # type: ignore
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        height, width, channels = frame.shape
+        stride = width * channels
+        nbytes = stride * height
+        if self._shm is None:
+            self._create(nbytes)
+        if nbytes > self.slot_bytes:
+            self.oversize += 1
+            return False
+        seq = self.seq + 1
+        buf = self._shm.buf
+        offset = BUS_HEADER_SIZE + (seq % self.slots) * (SLOT_HEADER_SIZE + self.slot_bytes)
+        _U64.pack_into(buf, offset, 0)
+        target = np.ndarray((height, width, channels), dtype=np.uint8, buffer=buf, offset=offset + SLOT_HEADER_SIZE)
+        np.copyto(target, frame, casting="unsafe")
+        del target  # no exported views may outlive the segment
+        stamp = time.monotonic_ns() if timestamp_ns is None else timestamp_ns
+        SLOT_HEADER.pack_into(buf, offset, 0, stamp, height, width, channels, stride)
+        _U64.pack_into(buf, offset, seq)
+        _U64.pack_into(buf, _LATEST_SEQ_OFFSET, seq)
+        self.seq = seq
+        self.published += 1
+        return True
+
+    def close(self) -> None:
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except Exception:
+            pass
+        _created_here.discard(self.name)
+        self._shm = None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "published": self.published,
+            "oversize": self.oversize,
+            "readers": self.has_readers(),
+        }
+
+
+class BusFrame:
+    """A frame read from the bus: `image` is a zero-copy view into shared memory."""
+
+    __slots__ = ("seq", "timestamp_ns", "image", "_offset")
+
+    def __init__(self, seq: int, timestamp_ns: int, image, offset: int) -> None:
+        self.seq = seq
+        self.timestamp_ns = timestamp_ns
+        self.image = image
+        self._offset = offset
+
+
+class FrameBusReader:
+    """
+    Attaches to a `FrameBusWriter` ring by name and returns zero-copy numpy
+    views of the newest frame.
+
+    A view stays valid until the writer wraps around to its slot
+    (`slots - 1` frames later). Check `is_valid(frame)` after processing (or
+    copy the image first) if a torn frame would matter.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._shm = _attach(name)
+        magic, version, self.slots, self.slot_bytes, _, _ = BUS_HEADER.unpack_from(self._shm.buf, 0)
+        if magic != FRAME_BUS_MAGIC or version != FRAME_BUS_VERSION:
+            self._shm.close()
+            raise ValueError(f"'{name}' is not a version {FRAME_BUS_VERSION} frame bus")
+        self.torn = 0
+
+    def _heartbeat(self) -> None:
+        _U64.pack_into(self._shm.buf, _HEARTBEAT_OFFSET, time.monotonic_ns())
+
+    def latest_seq(self) -> int:
+        return _U64.unpack_from(self._shm.buf, _LATEST_SEQ_OFFSET)[0]
+
+    def read(self, after_seq: int = 0) -> Optional[BusFrame]:
+        """Newest frame if it is newer than `after_seq`, else None."""
+        import numpy as np  # type: ignore
+        self._heartbeat()
+        seq = self.latest_seq()
+        if seq == 0 or seq == after_seq:
+            return None
+        offset = BUS_HEADER_SIZE + (seq % self.slots) * (SLOT_HEADER_SIZE + self.slot_bytes)
+        slot_seq, timestamp_ns, height, width, channels, stride = SLOT_HEADER.unpack_from(self._shm.buf, offset)
+        if slot_seq != seq:
+            # Overwritten between reading latest_seq and the slot header
+            self.torn += 1
+            return None
+        image = np.ndarray(
+            (height, width, channels), dtype=np.uint8, buffer=self._shm.buf,
+            offset=offset + SLOT_HEADER_SIZE, strides=(stride, channels, 1),
+        )
+        image.flags.writeable = False
+        return BusFrame(seq, timestamp_ns, image, offset)
+
+    def wait(self, after_seq: int = 0, timeout: float = 1.0, poll_interval: float = 0.002) -> Optional[BusFrame]:
+        """Poll until a frame newer than `after_seq` is available, or `timeout` passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            frame = self.read(after_seq)
+            if frame is not None or time.monotonic() >= deadline:
+                return frame
+            time.sleep(poll_interval)
+
+    def is_valid(self, frame: BusFrame) -> bool:
+        """True if the slot behind `frame.image` has not been overwritten since it was read."""
+        if _U64.unpack_from(self._shm.buf, frame._offset)[0] == frame.seq:
+            return True
+        self.torn += 1
+        return False
+
+    def close(self) -> None:
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view handed out by read() is still alive; the mapping goes with the process
+            pass
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+class FrameRing:
+    """
+    Recent encoded frames kept for replay, evicted by total size.
+
+    - Stores references to already-encoded, immutable frame objects (anything
+      with `seq` and a bytes-like `part`), so recording costs no copy and no
+      re-encoding; the byte budget is charged with `len(part)`.
+    - The oldest frames are evicted once the stored bytes exceed
+      `max_bytes`, so memory stays bounded whatever the resolution or quality.
+    - Each entry carries a monotonic and a wall-clock timestamp, taken when it
+      was recorded.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries = deque()  # (monotonic, wall, frame)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.evicted = 0
+
+    def append(self, frame) -> None:
+        size = len(frame.part)
+        if size > self.max_bytes:
+            return
+        entry = (time.monotonic(), time.time(), frame)
+        with self._lock:
+            self._entries.append(entry)
+            self._bytes += size
+            self.recorded += 1
+            while self._bytes > self.max_bytes:
+                _, _, old = self._entries.popleft()
+                self._bytes -= len(old.part)
+                self.evicted += 1
+
+    def recent(self, seconds: float) -> List[Tuple[float, float, object]]:
+        """Entries recorded in the last `seconds`, oldest first."""
+        cutoff = time.monotonic() - max(0.0, seconds)
+        with self._lock:
+            entries = list(self._entries)
+        start = 0
+        while start < len(entries) and entries[start][0] < cutoff:
+            start += 1
+        return entries[start:]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = len(self._entries)
+            span: Optional[float] = self._entries[-1][0] - self._entries[0][0] if count else None
+            stored = self._bytes
+        return {
+            "frames": count,
+            "bytes": stored,
+            "max_bytes": self.max_bytes,
+            "span_sec": round(span, 2) if span is not None else None,
+            "recorded": self.recorded,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,68 @@
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+
+class LatencyHistogram:
+    """
+    Rolling latency histogram over the most recent `window` samples (milliseconds).
+
+    - `add()` is cheap and thread-safe, so it can be called from I/O threads.
+    - `snapshot()` sorts the window to report min/avg/max, p50/p90/p99 and
+      per-bucket counts; call it from reporting paths (e.g. `/health`), not
+      per sample.
+    """
+
+    DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self, window: int = 512, buckets_ms: Iterable[float] = DEFAULT_BUCKETS_MS) -> None:
+        self.window = max(1, window)
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self.total_count = 0
+        self._samples = deque(maxlen=self.window)
+        self._lock = threading.Lock()
+
+    def add(self, value_ms: float) -> None:
+        with self._lock:
+            self._samples.append(value_ms)
+            self.total_count += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    @staticmethod
+    def _percentile(ordered, fraction: float) -> Optional[float]:
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            ordered = sorted(self._samples)
+            total = self.total_count
+        buckets: Dict[str, int] = {}
+        start = 0
+        for bound in self.buckets_ms:
+            count = 0
+            while start < len(ordered) and ordered[start] <= bound:
+                count += 1
+                start += 1
+            buckets[f"<={bound:g}"] = count
+        buckets[f">{self.buckets_ms[-1]:g}" if self.buckets_ms else "all"] = len(ordered) - start
+
+        def _round(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value, 3)
+
+        return {
+            "count": total,
+            "window": len(ordered),
+            "min_ms": _round(ordered[0] if ordered else None),
+            "avg_ms": _round(sum(ordered) / len(ordered) if ordered else None),
+            "p50_ms": _round(self._percentile(ordered, 0.50)),
+            "p90_ms": _round(self._percentile(ordered, 0.90)),
+            "p99_ms": _round(self._percentile(ordered, 0.99)),
+            "max_ms": _round(ordered[-1] if ordered else None),
+            "buckets": buckets,
+        }
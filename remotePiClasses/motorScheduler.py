@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+
+class MotorScheduler:
+    """
+    Sends motor target speeds to a `DirectionSystem` at a fixed tick rate.
+
+    - Command handlers only update the targets (`set_target_left/right`), so the
+      serial write rate is bounded by `tick_hz` whatever rate clients send at.
+    - Every tick hands the targets to `DirectionSystem.set_duty`, which
+      suppresses unchanged values and handles the keepalive resend.
+    - Targets expire: if no command arrives for `command_timeout_sec`
+      (0 = never), or `stop()` is called when the last control client goes
+      away, the targets are dropped and STOP is queued, so the keepalive never
+      keeps replaying a speed nobody is asking for.
+    - Tracks tick jitter (wake-up lateness) and missed deadlines (a tick that
+      woke more than one full interval late; the schedule is then re-aligned
+      instead of bursting to catch up).
+
+    Run with `await scheduler.run(shared_properties)`; it exits when
+    `shared_properties.endOfProgram` becomes truthy.
+    """
+
+    def __init__(self, direction=None, tick_hz: float = 50.0, command_timeout_sec: float = 0.0,
+                 debug: bool = False) -> None:
+        self.direction = direction
+        self.tick_hz = max(1.0, float(tick_hz))
+        self.command_timeout_sec = max(0.0, float(command_timeout_sec))
+        self.debug = debug
+
+        self._target_left: Optional[int] = None
+        self._target_right: Optional[int] = None
+        self._last_command_time = 0.0
+
+        self.ticks = 0
+        self.writes = 0
+        self.skipped_unchanged = 0
+        self.missed_deadlines = 0
+        self.jitter_avg_ms = 0.0
+        self.jitter_max_ms = 0.0
+        self.stops = 0
+        self.command_timeouts = 0
+
+    def set_target_left(self, duty: int) -> None:
+        self._target_left = duty
+        self._last_command_time = time.monotonic()
+
+    def set_target_right(self, duty: int) -> None:
+        self._target_right = duty
+        self._last_command_time = time.monotonic()
+
+    def set_targets(self, left: int, right: int) -> None:
+        self._target_left = left
+        self._target_right = right
+        self._last_command_time = time.monotonic()
+
+    def clear_targets(self) -> None:
+        """Drop the current targets; nothing is written until a new command arrives."""
+        self._target_left = None
+        self._target_right = None
+
+    def stop(self) -> None:
+        """Drop the targets and queue STOP; nothing more is written until a new command arrives."""
+        self.clear_targets()
+        self.stops += 1
+        if self.direction is not None:
+            self.direction.stop()
+
+    def tick(self) -> None:
+        self.ticks += 1
+        if self.direction is None:
+            return
+        left, right = self._target_left, self._target_right
+        if left is None and right is None:
+            return
+        if self.command_timeout_sec and time.monotonic() - self._last_command_time > self.command_timeout_sec:
+            self.command_timeouts += 1
+            logging.warning(f"No motor command for {self.command_timeout_sec}s; stopping motors")
+            self.stop()
+            return
+        if self.direction.set_duty(left, right):
+            self.writes += 1
+            if self.debug:
+                logging.info(f"Motor tick wrote L:{left} R:{right}")
+        else:
+            self.skipped_unchanged += 1
+
+    def _record_jitter(self, late_s: float) -> None:
+        late_ms = late_s * 1000.0
+        self.jitter_avg_ms += 0.05 * (late_ms - self.jitter_avg_ms)
+        if late_ms > self.jitter_max_ms:
+            self.jitter_max_ms = late_ms
+
+    async def run(self, shared_properties) -> None:
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_hz
+        deadline = loop.time() + interval
+        while not shared_properties.endOfProgram:
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            late = now - deadline
+            self._record_jitter(max(0.0, late))
+            if late > interval:
+                self.missed_deadlines += 1
+                deadline = now
+            try:
+                self.tick()
+            except Exception:
+                logging.exception("Motor scheduler tick failed")
+            deadline += interval
+
+    def stats(self) -> dict:
+        return {
+            "tick_hz": self.tick_hz,
+            "ticks": self.ticks,
+            "writes": self.writes,
+            "skipped_unchanged": self.skipped_unchanged,
+            "missed_deadlines": self.missed_deadlines,
+            "jitter_avg_ms": round(self.jitter_avg_ms, 3),
+            "jitter_max_ms": round(self.jitter_max_ms, 3),
+            "stops": self.stops,
+            "command_timeouts": self.command_timeouts,
+        }
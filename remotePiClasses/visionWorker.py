@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+from typing import Optional
+
+from remotePiClasses.latencyStats import LatencyHistogram
+
+
+NO_OBSTACLE = 999999  # same "nothing seen" value robotProgram() starts with
+
+
+class FreeSpaceEstimator:
+    """
+    Flat-floor obstacle estimate from one downscaled BGR frame (numpy only).
+
+    - The floor colour is sampled from the bottom rows in the middle of the
+      image; every pixel that differs from it by more than `threshold`
+      (summed over B, G, R) in two consecutive rows counts as obstacle.
+    - Scanning each column upwards from the bottom gives the first obstacle
+      row; a per-row lookup table turns that row into a ground distance from
+      the camera height, vertical field of view and downward tilt.
+    - `frontal_cm` is the nearest obstacle in the centre `corridor` fraction of
+      the columns, `nearest_cm` the nearest anywhere in view.
+    """
+
+    def __init__(self, width: int = 80, height: int = 60, camera_height_cm: float = 12.0,
+                 vfov_deg: float = 48.0, tilt_deg: float = 10.0, threshold: int = 60,
+                 corridor: float = 0.4) -> None:
+        import numpy as np  # type: ignore
+        self.width = width
+        self.height = height
+        self.threshold = threshold
+        half = max(1, int(width * min(1.0, max(0.05, corridor)) / 2))
+        self._corridor = slice(max(0, width // 2 - half), min(width, width // 2 + half))
+        self._sample = slice(width // 3, max(width // 3 + 1, 2 * width // 3))
+        # Ground distance of each image row (inf at or above the horizon)
+        rows = np.arange(height, dtype=np.float64) + 0.5
+        depression = np.radians(tilt_deg + (rows - height / 2.0) / height * vfov_deg)
+        with np.errstate(divide="ignore"):
+            self._row_distance = np.where(depression > 0, camera_height_cm / np.tan(depression), np.inf)
+
+    def estimate(self, small) -> dict:
+        import numpy as np  # type: ignore
+        pixels = small.astype(np.int16)
+        floor = np.median(pixels[-3:, self._sample].reshape(-1, pixels.shape[2]), axis=0)
+        obstacle = np.abs(pixels - floor).sum(axis=2) > self.threshold
+        obstacle = obstacle[1:] & obstacle[:-1]  # ignore single-row speckle
+        from_bottom = obstacle[::-1]
+        blocked = from_bottom.any(axis=0)
+        free_rows = np.where(blocked, from_bottom.argmax(axis=0), obstacle.shape[0])
+        boundary = np.clip(obstacle.shape[0] - free_rows, 0, self.height - 1)
+        distance = np.where(blocked, self._row_distance[boundary], np.inf)
+        frontal = float(distance[self._corridor].min())
+        nearest = float(distance.min())
+        return {
+            "frontal_cm": round(frontal, 1) if math.isfinite(frontal) else NO_OBSTACLE,
+            "nearest_cm": round(nearest, 1) if math.isfinite(nearest) else NO_OBSTACLE,
+            "free_ratio": round(float(free_rows.mean()) / obstacle.shape[0], 3),
+        }
+
+
+def _worker_main(argv=None) -> None:
+    """Child process: read the frame bus, estimate, print one JSON line per result."""
+    parser = argparse.ArgumentParser(description="Frame bus vision worker")
+    parser.add_argument("--bus", required=True)
+    parser.add_argument("--width", type=int, default=80)
+    parser.add_argument("--height", type=int, default=60)
+    parser.add_argument("--rate-hz", type=float, default=10.0)
+    parser.add_argument("--camera-height-cm", type=float, default=12.0)
+    parser.add_argument("--vfov-deg", type=float, default=48.0)
+    parser.add_argument("--tilt-deg", type=float, default=10.0)
+    parser.add_argument("--threshold", type=int, default=60)
+    parser.add_argument("--corridor", type=float, default=0.4)
+    parser.add_argument("--nice", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    import cv2  # type: ignore
+    from remotePiClasses.frameBus import FrameBusReader
+
+    try:
+        os.nice(args.nice)  # the control loop comes first
+    except OSError:
+        pass
+    estimator = FreeSpaceEstimator(args.width, args.height, args.camera_height_cm, args.vfov_deg,
+                                   args.tilt_deg, args.threshold, args.corridor)
+    reader = None
+    while reader is None:
+        try:
+            reader = FrameBusReader(args.bus)
+        except FileNotFoundError:
+            time.sleep(0.5)  # camera not publishing yet
+
+    interval = 1.0 / max(0.1, args.rate_hz)
+    processed = dropped = skipped = 0
+    last_seq = 0
+    throttled = False
+    while True:
+        frame = reader.wait(last_seq, timeout=1.0)
+        if frame is None:
+            continue
+        if last_seq and frame.seq > last_seq + 1:
+            # Frames we never looked at: expected while rate-limited, a drop otherwise
+            if throttled:
+                skipped += frame.seq - last_seq - 1
+            else:
+                dropped += frame.seq - last_seq - 1
+        last_seq = frame.seq
+        started = time.monotonic()
+        small = cv2.resize(frame.image, (args.width, args.height), interpolation=cv2.INTER_AREA)
+        if not reader.is_valid(frame):
+            dropped += 1  # overwritten while we were reading it
+            continue
+        result = estimator.estimate(small)
+        processed += 1
+        done_ns = time.monotonic_ns()
+        result.update(
+            seq=frame.seq,
+            latency_ms=round((done_ns - frame.timestamp_ns) / 1e6, 2),
+            process_ms=round((time.monotonic() - started) * 1000.0, 2),
+            processed=processed,
+            dropped=dropped,
+            skipped=skipped,
+        )
+        del frame, small
+        sys.stdout.write(json.dumps(result, separators=(",", ":")) + "\n")
+        sys.stdout.flush()
+        rest = interval - (time.monotonic() - started)
+        throttled = rest > 0
+        if throttled:
+            time.sleep(rest)
+
+
+class VisionWorker:
+    """
+    Runs obstacle estimation in a separate Python process fed by the camera
+    frame bus, so the numpy/OpenCV work never holds the event loop's GIL.
+
+    - The child (`python -m remotePiClasses.visionWorker`) reads raw frames
+      from the shared-memory bus, downscales them, and prints at most
+      `rate_hz` compact JSON results; frames it falls behind on are counted as
+      dropped.
+    - `run()` applies each result to the shared robot state (`frontalDistance`,
+      `objectDetection` and `forceStopForward` when the forward corridor is
+      closer than `stop_distance_cm`), resets them when results go stale, and
+      restarts the child if it exits.
+    """
+
+    def __init__(self, bus_name: str, rate_hz: float = 10.0, width: int = 80, height: int = 60,
+                 camera_height_cm: float = 12.0, vfov_deg: float = 48.0, tilt_deg: float = 10.0,
+                 threshold: int = 60, corridor: float = 0.4, stop_distance_cm: float = 25.0,
+                 stale_sec: float = 1.0, debug: bool = False) -> None:
+        self.bus_name = bus_name
+        self.rate_hz = max(0.1, float(rate_hz))
+        self.stop_distance_cm = float(stop_distance_cm)
+        self.stale_sec = max(0.1, float(stale_sec))
+        self.debug = debug
+        self._args = [
+            "--bus", bus_name, "--rate-hz", str(self.rate_hz),
+            "--width", str(int(width)), "--height", str(int(height)),
+            "--camera-height-cm", str(camera_height_cm), "--vfov-deg", str(vfov_deg),
+            "--tilt-deg", str(tilt_deg), "--threshold", str(int(threshold)), "--corridor", str(corridor),
+        ]
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self.last_result: Optional[dict] = None
+        self._last_result_at = 0.0
+        self.results = 0
+        self.latency = LatencyHistogram(window=256)  # capture -> result
+        self.restarts = 0
+        self.stale_resets = 0
+
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "remotePiClasses.visionWorker", *self._args,
+            cwd=repo_root, stdout=asyncio.subprocess.PIPE,
+        )
+
+    def _apply(self, shared_properties, result: dict) -> None:
+        shared_properties.frontalDistance = result["frontal_cm"]
+        shared_properties.objectDetection = result["nearest_cm"]
+        shared_properties.forceStopForward = 1 if result["frontal_cm"] < self.stop_distance_cm else 0
+
+    def _reset(self, shared_properties) -> None:
+        shared_properties.frontalDistance = NO_OBSTACLE
+        shared_properties.objectDetection = NO_OBSTACLE
+        shared_properties.forceStopForward = 0
+
+    async def _read_results(self, shared_properties) -> None:
+        process = self._process
+        while not shared_properties.endOfProgram:
+            try:
+                line = await asyncio.wait_for(process.stdout.readline(), timeout=self.stale_sec)
+            except asyncio.TimeoutError:
+                if self.last_result is not None and time.monotonic() - self._last_result_at > self.stale_sec:
+                    self.stale_resets += 1
+                    self.last_result = None
+                    self._reset(shared_properties)
+                    logging.warning("Vision results stale; obstacle state reset")
+                continue
+            if not line:
+                return  # child exited
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            self.last_result = result
+            self._last_result_at = time.monotonic()
+            self.results += 1
+            self.latency.add(result.get("latency_ms", 0.0))
+            self._apply(shared_properties, result)
+            if self.debug:
+                logging.info(f"Vision: {result}")
+
+    async def run(self, shared_properties) -> None:
+        try:
+            while not shared_properties.endOfProgram:
+                self._process = await self._spawn()
+                logging.info(f"Vision worker started (pid {self._process.pid}, bus '{self.bus_name}')")
+                await self._read_results(shared_properties)
+                if shared_properties.endOfProgram:
+                    break
+                self._reset(shared_properties)
+                self.last_result = None
+                self.restarts += 1
+                logging.warning("Vision worker exited; restarting")
+                await asyncio.sleep(1.0)
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=2.0)
+        except asyncio.TimeoutError:
+            process.kill()
+
+    def stats(self) -> dict:
+        result = self.last_result or {}
+        return {
+            "running": self._process is not None and self._process.returncode is None,
+            "results": self.results,
+            "restarts": self.restarts,
+            "stale_resets": self.stale_resets,
+            "latency": self.latency.snapshot(),
+            "process_ms": result.get("process_ms"),
+            "processed": result.get("processed"),
+            "dropped": result.get("dropped"),
+            "skipped": result.get("skipped"),
+            "frontal_cm": result.get("frontal_cm"),
+            "nearest_cm": result.get("nearest_cm"),
+        }
+
+
+if __name__ == "__main__":
+    try:
+        _worker_main()
+    except KeyboardInterrupt:
+        pass
@@ -1,9 +1,17 @@
 import asyncio
 import sys
-import socket
 import time
 import RPi.GPIO as GPIO
 from remotePiClasses.directionClass import DirectionSystem
+from remotePiClasses.motorScheduler import MotorScheduler
+from remotePiClasses.commandFraming import (
+    CommandFramer,
+    BinaryFrameDecoder,
+    SequenceTracker,
+    coalesce_commands,
+    is_binary_stream,
+    parse_text_datagram,
+)
 import remotePiClasses.configClass as Config
 import fcntl, os
 import logging
@@ -13,6 +21,7 @@ import shutil
 import glob
 import psutil
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 try:
     from serial.tools import list_ports  # type: ignore
 except Exception:
@@ -37,6 +46,8 @@ console_handler.setFormatter(log_formatter)
 logger.addHandler(console_handler)
 
 # --- Direction system (Arduino motor controller) ---
+DIRECTION_BAUD = CONFIG.get('motor_baud', 115200)
+
 def find_candidate_motor_ports():
     candidates = []
     # Configured port first, if provided
@@ -57,40 +68,182 @@ def find_candidate_motor_ports():
     candidates.extend(sorted(glob.glob('/dev/ttyUSB*')))
     candidates.extend(sorted(glob.glob('/dev/ttyAMA*')))
 
-    # Deduplicate while preserving order
+    # Deduplicate while preserving order; by-id links and their /dev/tty* targets
+    # are the same device and must not be opened twice by the parallel probe
     unique = []
     seen = set()
     for c in candidates:
-        if c and c not in seen:
-            seen.add(c)
+        key = os.path.realpath(c) if c else c
+        if c and key not in seen:
+            seen.add(key)
             unique.append(c)
     return unique
 
-DIRECTION_BAUD = CONFIG.get('motor_baud', 115200)
-direction = None
-DIRECTION_SERIAL_PORT = None
-for candidate_port in find_candidate_motor_ports():
+MOTOR_PORT_CACHE_FILE = CONFIG.get('motor_port_cache_file', 'motor_port.cache')
+
+def stable_port_path(port):
+    # Prefer the /dev/serial/by-id name, which survives re-enumeration (ttyACM0 -> ttyACM1)
+    real = os.path.realpath(port)
+    for link in sorted(glob.glob('/dev/serial/by-id/*')):
+        if os.path.realpath(link) == real:
+            return link
+    return port
+
+def load_cached_motor_port():
     try:
-        direction = DirectionSystem(
-            port=candidate_port,
-            baudrate=DIRECTION_BAUD,
-            debug=bool(Config.DEBUG_ENABLED),
-        )
-        DIRECTION_SERIAL_PORT = candidate_port
-        logging.info(f"DirectionSystem initialized on {candidate_port} @ {DIRECTION_BAUD} bps")
-        break
+        with open(MOTOR_PORT_CACHE_FILE, 'r') as f:
+            port = f.read().strip()
+    except OSError:
+        return None
+    return port if port and os.path.exists(port) else None
+
+def save_cached_motor_port(port):
+    try:
+        with open(MOTOR_PORT_CACHE_FILE, 'w') as f:
+            f.write(stable_port_path(port) + '\n')
+    except OSError as e:
+        logging.warning(f"Could not cache motor port in {MOTOR_PORT_CACHE_FILE}: {e}")
+
+def open_direction_system(port, handshake, handshake_required=True):
+    return DirectionSystem(
+        port=port,
+        baudrate=DIRECTION_BAUD,
+        debug=bool(Config.DEBUG_ENABLED),
+        queue_size=CONFIG.get('motor_queue_size', 8),
+        combined_frames=CONFIG.get('motor_combined_frames', False),
+        keepalive_sec=CONFIG.get('motor_keepalive_sec', 0.5),
+        ack_sequence=CONFIG.get('motor_ack_sequence', False),
+        handshake=handshake,
+        handshake_timeout=CONFIG.get('motor_handshake_timeout_sec', 3.0),
+        handshake_required=handshake_required,
+    )
+
+def probe_ports_in_parallel(ports, handshake_required=True):
+    # Handshake every port at once; the first controller that answers wins and
+    # any other port that opens later is closed again.
+    if not ports:
+        return None, None
+    executor = ThreadPoolExecutor(max_workers=len(ports), thread_name_prefix='MotorProbe')
+    futures = {executor.submit(open_direction_system, port, True, handshake_required): port for port in ports}
+    winner = None
+    try:
+        for future in as_completed(futures):
+            port = futures[future]
+            try:
+                found = future.result()
+            except Exception as e:
+                logging.info(f"No motor controller on {port}: {e}")
+                continue
+            winner = (found, port)
+            break
+    finally:
+        def _close_extra(future):
+            if winner is not None and future.exception() is None and future.result() is not winner[0]:
+                future.result().close()
+        for future in futures:
+            future.add_done_callback(_close_extra)
+        executor.shutdown(wait=False)
+    return winner if winner is not None else (None, None)
+
+def open_first_motor_port(ports):
+    # Legacy: first port that opens, one at a time, without a handshake
+    for candidate_port in ports:
+        try:
+            return open_direction_system(candidate_port, False), candidate_port
+        except Exception as e:
+            logging.warning(f"Failed to open motor controller on {candidate_port}: {e}")
+    return None, None
+
+def preferred_motor_ports():
+    # Configured and last-good ports, so a normal boot touches no other device
+    preferred = []
+    for port in (CONFIG.get('motor_serial_port'), load_cached_motor_port()):
+        if port and os.path.exists(port) and os.path.realpath(port) not in [os.path.realpath(p) for p in preferred]:
+            preferred.append(port)
+    return preferred
+
+def is_trusted_motor_link(ds, port):
+    # Only a port that answered the handshake or was configured may be cached
+    configured = CONFIG.get('motor_serial_port')
+    return ds.firmware_info is not None or bool(configured and os.path.realpath(configured) == os.path.realpath(port))
+
+def probe_motor_controller(blind_fallback=True):
+    """
+    Find the motor controller. With `blind_fallback` (boot only), when nothing
+    answers the handshake and no port is configured or cached, the first
+    serial port that opens is used; the supervisor passes False so a missing
+    controller never gets replaced by an unrelated UART.
+    """
+    candidates = find_candidate_motor_ports()
+    preferred = preferred_motor_ports()
+    if not CONFIG.get('motor_handshake', False):
+        return open_first_motor_port(candidates if blind_fallback else preferred)
+    # A known port that opens but stays silent (firmware without PING/PONG) is
+    # used as is, without PING-ing every other tty first
+    found, port = probe_ports_in_parallel(preferred, handshake_required=False)
+    if found is None:
+        preferred_real = set(os.path.realpath(p) for p in preferred)
+        found, port = probe_ports_in_parallel([c for c in candidates if os.path.realpath(c) not in preferred_real])
+    if found is None and not preferred and candidates and blind_fallback:
+        # Nothing configured or cached yet: same fallback over every candidate
+        logging.warning("No motor controller answered the handshake; opening the first port that opens")
+        found, port = open_first_motor_port(candidates)
+    return found, port
+
+def reopen_motor_port(port, handshake):
+    # Only the device the link was on; no other tty is opened or written to
+    if not os.path.exists(port):
+        return None, None
+    try:
+        return open_direction_system(port, handshake), port
     except Exception as e:
-        logging.warning(f"Failed to open motor controller on {candidate_port}: {e}")
-        direction = None
-        continue
+        if Config.DEBUG_ENABLED:
+            logging.info(f"Motor controller not back on {port} yet: {e}")
+        return None, None
+
+probe_start_time = time.monotonic()
+direction, DIRECTION_SERIAL_PORT = probe_motor_controller()
+if direction is not None:
+    if is_trusted_motor_link(direction, DIRECTION_SERIAL_PORT):
+        save_cached_motor_port(DIRECTION_SERIAL_PORT)
+    logging.info(f"DirectionSystem initialized on {DIRECTION_SERIAL_PORT} @ {DIRECTION_BAUD} bps "
+                 f"in {time.monotonic() - probe_start_time:.2f}s (firmware: {direction.firmware_info})")
 if direction is None:
     logging.error("No usable serial port found for DirectionSystem. Set 'motor_serial_port' in config.json or connect the device.")
 
+# No motor command for this long stops the motors (0 = never). A UDP driver has
+# no disconnect to clear its targets, so with UDP control the default is 1 s.
+MOTOR_COMMAND_TIMEOUT_SEC = CONFIG.get('motor_command_timeout_sec')
+if MOTOR_COMMAND_TIMEOUT_SEC is None:
+    MOTOR_COMMAND_TIMEOUT_SEC = 1.0 if CONFIG.get('enable_udp_control', False) else 0.0
+
+# Motor commands are applied at a fixed rate, independent of how fast clients send them
+motor_scheduler = MotorScheduler(
+    direction,
+    tick_hz=CONFIG.get('motor_tick_hz', 50),
+    command_timeout_sec=MOTOR_COMMAND_TIMEOUT_SEC,
+    debug=bool(Config.DEBUG_ENABLED),
+)
+
 # --- Metrics ---
 service_start_time = time.time()
 metrics = {
     'connections': 0,
     'commands_processed': 0,
+    'commands_coalesced': 0,
+    'binary_frames': 0,
+    'binary_seq_gaps': 0,
+    'command_latency_ms': 0.0,
+    'command_latency_avg_ms': 0.0,
+    'udp_datagrams': 0,
+    'udp_rejected': 0,
+    'udp_clients': {},
+    'motor_link_state': 'connected' if direction is not None else 'reconnecting',
+    'motor_disconnects': 0,
+    'motor_reconnects': 0,
+    'motor_commands_rejected': 0,
+    'motor_last_recovery_sec': None,
+    'motor_max_recovery_sec': None,
     'errors': 0,
     'uptime_sec': 0,
     'memory_mb': 0.0
@@ -105,6 +258,75 @@ CAMERA_WIDTH = CONFIG.get('camera_width', 640)
 CAMERA_HEIGHT = CONFIG.get('camera_height', 480)
 CAMERA_FPS = CONFIG.get('camera_fps', 20)
 CAMERA_JPEG_QUALITY = CONFIG.get('camera_jpeg_quality', 80)
+CAMERA_JPEG_PASSTHROUGH = CONFIG.get('camera_jpeg_passthrough', False)
+CAMERA_IDLE_TIMEOUT_SEC = CONFIG.get('camera_idle_timeout_sec', 0)
+CAMERA_IDLE_MODE = CONFIG.get('camera_idle_mode', 'release')
+CAMERA_KEEPWARM_FPS = CONFIG.get('camera_keepwarm_fps', 1)
+CAMERA_ENCODER_WORKERS = CONFIG.get('camera_encoder_workers', 1)
+CAMERA_CLIENT_SNDBUF_BYTES = CONFIG.get('camera_client_sndbuf_bytes', 131072)
+CAMERA_VARIANTS = CONFIG.get('camera_variants', {})
+CAMERA_MOTION_GATE = CONFIG.get('camera_motion_gate', False)
+CAMERA_MOTION_THRESHOLD = CONFIG.get('camera_motion_threshold', 0.01)
+CAMERA_MOTION_KEYFRAME_SEC = CONFIG.get('camera_motion_keyframe_sec', 2.0)
+CAMERA_RING_BUFFER_BYTES = CONFIG.get('camera_ring_buffer_bytes', 16 * 1024 * 1024)
+CAMERA_RING_BUFFER_FULL_SIZE = CONFIG.get('camera_ring_buffer_full_size', False)
+# Raw frames for local consumers; the vision process reads them when enabled
+ENABLE_VISION = CONFIG.get('enable_vision', False) and ENABLE_CAMERA_STREAM
+CAMERA_FRAME_BUS_NAME = CONFIG.get('camera_frame_bus_name', '') or ('remotepi_frames' if ENABLE_VISION else '')
+CAMERA_FRAME_BUS_SLOTS = CONFIG.get('camera_frame_bus_slots', 4)
+CAMERA_DEVICE = CONFIG.get('camera_device', '')
+# Optional list of cameras served by one CameraManager; the camera_* keys above are their defaults
+CAMERA_CONFIGS = CONFIG.get('cameras', [])
+CAMERA_CPU_BUDGET_CORES = CONFIG.get('camera_cpu_budget_cores', 0)
+CAMERA_BANDWIDTH_BUDGET_KBPS = CONFIG.get('camera_bandwidth_budget_kbps', 0)
+CAMERA_SATURATION_PERCENT = CONFIG.get('camera_saturation_percent', 90)
+
+def build_camera_streamer(entry, position):
+    # Per-camera entry keys override the single-camera camera_* settings; the
+    # frame bus (vision input) stays on the first camera unless set explicitly
+    from remotePiClasses.cameraStreamer import CameraStreamer
+    return CameraStreamer(
+        camera_index=entry.get('index', CAMERA_INDEX if position == 0 else position),
+        frame_width=entry.get('width', CAMERA_WIDTH),
+        frame_height=entry.get('height', CAMERA_HEIGHT),
+        target_fps=entry.get('fps', CAMERA_FPS),
+        jpeg_quality=entry.get('jpeg_quality', CAMERA_JPEG_QUALITY),
+        jpeg_passthrough=entry.get('jpeg_passthrough', CAMERA_JPEG_PASSTHROUGH),
+        idle_timeout_sec=entry.get('idle_timeout_sec', CAMERA_IDLE_TIMEOUT_SEC),
+        idle_mode=entry.get('idle_mode', CAMERA_IDLE_MODE),
+        keepwarm_fps=entry.get('keepwarm_fps', CAMERA_KEEPWARM_FPS),
+        encoder_workers=entry.get('encoder_workers', CAMERA_ENCODER_WORKERS),
+        client_sndbuf_bytes=entry.get('client_sndbuf_bytes', CAMERA_CLIENT_SNDBUF_BYTES),
+        variants=entry.get('variants', CAMERA_VARIANTS),
+        motion_gate=entry.get('motion_gate', CAMERA_MOTION_GATE),
+        motion_threshold=entry.get('motion_threshold', CAMERA_MOTION_THRESHOLD),
+        motion_keyframe_sec=entry.get('motion_keyframe_sec', CAMERA_MOTION_KEYFRAME_SEC),
+        ring_buffer_bytes=entry.get('ring_buffer_bytes', CAMERA_RING_BUFFER_BYTES),
+        ring_buffer_full_size=entry.get('ring_buffer_full_size', CAMERA_RING_BUFFER_FULL_SIZE),
+        frame_bus_name=entry.get('frame_bus_name', CAMERA_FRAME_BUS_NAME if position == 0 else '') or None,
+        frame_bus_slots=entry.get('frame_bus_slots', CAMERA_FRAME_BUS_SLOTS),
+        camera_device=entry.get('device', CAMERA_DEVICE if position == 0 else '') or None,
+        name=entry.get('name', 'camera'),
+        debug=bool(Config.DEBUG_ENABLED),
+    )
+
+# Optional obstacle estimation in a separate process, fed by the camera frame bus
+vision_worker = None
+if ENABLE_VISION:
+    from remotePiClasses.visionWorker import VisionWorker
+    vision_worker = VisionWorker(
+        CAMERA_FRAME_BUS_NAME,
+        rate_hz=CONFIG.get('vision_rate_hz', 10),
+        width=CONFIG.get('vision_width', 80),
+        height=CONFIG.get('vision_height', 60),
+        camera_height_cm=CONFIG.get('vision_camera_height_cm', 12),
+        vfov_deg=CONFIG.get('vision_camera_vfov_deg', 48),
+        tilt_deg=CONFIG.get('vision_camera_tilt_deg', 10),
+        threshold=CONFIG.get('vision_threshold', 60),
+        corridor=CONFIG.get('vision_corridor', 0.4),
+        stop_distance_cm=CONFIG.get('vision_stop_distance_cm', 25),
+        debug=bool(Config.DEBUG_ENABLED),
+    )
 
 # --- Uptime and memory usage logging ---
 async def metrics_logger_task():
@@ -151,6 +373,23 @@ if ENABLE_HEALTH_SERVER:
                 'status': 'ok',
                 'connections': metrics['connections'],
                 'commands_processed': metrics['commands_processed'],
+                'commands_coalesced': metrics['commands_coalesced'],
+                'binary_frames': metrics['binary_frames'],
+                'binary_seq_gaps': metrics['binary_seq_gaps'],
+                'command_latency_ms': metrics['command_latency_ms'],
+                'command_latency_avg_ms': metrics['command_latency_avg_ms'],
+                'udp_datagrams': metrics['udp_datagrams'],
+                'udp_rejected': metrics['udp_rejected'],
+                'udp_clients': metrics['udp_clients'],
+                'motor_scheduler': motor_scheduler.stats(),
+                'motor_link': direction.stats() if direction is not None else None,
+                'motor_link_state': metrics['motor_link_state'],
+                'motor_disconnects': metrics['motor_disconnects'],
+                'motor_reconnects': metrics['motor_reconnects'],
+                'motor_commands_rejected': metrics['motor_commands_rejected'],
+                'motor_last_recovery_sec': metrics['motor_last_recovery_sec'],
+                'motor_max_recovery_sec': metrics['motor_max_recovery_sec'],
+                'vision': vision_worker.stats() if vision_worker is not None else None,
                 'errors': metrics['errors'],
                 'uptime_sec': metrics['uptime_sec'],
                 'memory_mb': metrics['memory_mb']
@@ -170,25 +409,15 @@ else:
     async def start_health_server():
         pass
 
-# Create a TCP/IP socket
-SYSTEMD_FIRST_SOCKET_FD = 1
-sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-#sock = socket.fromfd(SYSTEMD_FIRST_SOCKET_FD, socket.AF_INET, socket.SOCK_STREAM)
-
-# Reusable socket
-sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-# Non blocking socket
-#fcntl.fcntl(sock, fcntl.F_SETFL, os.O_NONBLOCK)
-sock.setblocking(0)
-
-# Bind the socket to the port
+# Control server address (asyncio streams, one reader coroutine per client)
 server_address = (CONFIG.get('host', '0.0.0.0'), CONFIG.get('port', 9999))
-logging.info('starting up on (%s,%s)', server_address[0], server_address[1])
-sock.bind(server_address)
 
-# Listen for incoming connections
-sock.listen(SYSTEMD_FIRST_SOCKET_FD)
+# Optional UDP control channel (same commands, sequence-numbered datagrams)
+ENABLE_UDP_CONTROL = CONFIG.get('enable_udp_control', False)
+udp_server_address = (CONFIG.get('udp_host', server_address[0]), CONFIG.get('udp_port', 9998))
+UDP_MAX_TRACKED_CLIENTS = 64
+UDP_DRIVER_ACTIVE_SEC = max(1.0, MOTOR_COMMAND_TIMEOUT_SEC)  # a sender counts as driving this long after its last datagram
+udp_control = None  # UdpControlProtocol while the UDP channel is up
 
 #GPIO Mode (BOARD / BCM)
 GPIO.setmode(GPIO.BCM)
@@ -199,91 +428,318 @@ GPIO.setup(RESET_TRIGGER_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 #Disable warnings
 GPIO.setwarnings(False)
 
-async def thread_socket_server(sharedProperties):
-    while not sharedProperties.endOfProgram:        
-        if sharedProperties.connection is None:
-            logging.info('waiting for a connection')
+CONTROL_READ_SIZE = 65536  # Large enough to drain a whole burst in one read
+
+def apply_motor_command(side, value):
+    # Only updates the scheduler's target; the serial write happens on its next tick
+    if direction is None:
+        # No link (or reconnecting): rejected, never replayed later
+        metrics['motor_commands_rejected'] += 1
+        if Config.DEBUG_ENABLED:
+            logging.error(f"DirectionSystem unavailable; cannot set {side} speed")
+        return
+    duty = direction.map_power_to_duty(value)
+    if side == 'left':
+        motor_scheduler.set_target_left(duty)
+    else:
+        motor_scheduler.set_target_right(duty)
+    if Config.DEBUG_ENABLED:
+        logging.info(f"Set {side} speed to {value}")
+
+def apply_motor_duty(left, right):
+    # Binary protocol path: integer duty values, no string parsing
+    if direction is None:
+        metrics['motor_commands_rejected'] += 1
+        if Config.DEBUG_ENABLED:
+            logging.error("DirectionSystem unavailable; cannot set speeds")
+        return
+    motor_scheduler.set_targets(left, right)
+    if Config.DEBUG_ENABLED:
+        logging.info(f"Set duty to L:{left} R:{right}")
+
+def record_command_latency(timestamp_us):
+    # One-way latency from the client's send timestamp; meaningful when the
+    # client and the Pi clocks are NTP-synchronized.
+    latency_ms = (time.time() * 1e6 - timestamp_us) / 1000.0
+    metrics['command_latency_ms'] = latency_ms
+    if metrics['command_latency_avg_ms'] == 0.0:
+        metrics['command_latency_avg_ms'] = latency_ms
+    else:
+        metrics['command_latency_avg_ms'] += 0.05 * (latency_ms - metrics['command_latency_avg_ms'])
+
+def dispatch_binary_frames(frames, last_seq):
+    # Each frame carries both wheels, so the newest frame of the burst wins
+    for frame in frames:
+        if last_seq is not None and frame.seq != (last_seq + 1) & 0xFFFFFFFF:
+            metrics['binary_seq_gaps'] += 1
+        last_seq = frame.seq
+    newest = frames[-1]
+    apply_motor_duty(newest.left, newest.right)
+    record_command_latency(newest.timestamp_us)
+    metrics['binary_frames'] += len(frames)
+    metrics['commands_processed'] += len(frames)
+    metrics['commands_coalesced'] += len(frames) - 1
+    return last_seq
+
+def handle_command_line(line, sharedProperties):
+    if line == "reset":
+        sharedProperties.endOfProgram = 1
+        logging.info("Received reset command")
+        metrics['commands_processed'] += 1
+    # (other command handling as needed)
+
+def dispatch_command_lines(lines, sharedProperties):
+    # Latest wins: only the newest L:/R: value of each burst reaches the motors
+    batch = coalesce_commands(lines)
+    if batch.left is not None:
+        apply_motor_command('left', batch.left)
+    if batch.right is not None:
+        apply_motor_command('right', batch.right)
+    metrics['commands_processed'] += batch.motor_commands
+    metrics['commands_coalesced'] += batch.coalesced
+    if batch.coalesced and Config.DEBUG_ENABLED:
+        logging.info('coalesced %d stale motor commands', batch.coalesced)
+    for line in batch.others:
+        handle_command_line(line, sharedProperties)
+
+async def handle_control_client(reader, writer, sharedProperties):
+    client_address = writer.get_extra_info('peername')
+    metrics['connections'] += 1
+    sharedProperties.connections.add(writer)
+    logging.info('connection from: %s', client_address)
+    framer = None
+    last_seq = None
+    try:
+        while not sharedProperties.endOfProgram:
+            # Wakes up only when the client sends data or closes the connection
+            raw = await reader.read(CONTROL_READ_SIZE)
+            if not raw:
+                logging.info("Client disconnected (EOF) %s", client_address)
+                break
+            if framer is None:
+                # Protocol is chosen once per connection from its first byte
+                if is_binary_stream(raw):
+                    framer = BinaryFrameDecoder()
+                    logging.info('binary control protocol from: %s', client_address)
+                else:
+                    framer = CommandFramer()
+            if Config.DEBUG_ENABLED:
+                logging.info('raw data: %r', raw)
+            items = framer.feed(raw)
+            if not items:
+                continue
             try:
-                sharedProperties.connection, client_address = sock.accept()
-                metrics['connections'] += 1
-                logging.info('connection from: %s', client_address)
-                sharedProperties.connection.setblocking(0)
-                # ColorModule.turnOnBlueLed()
-            except IOError as e:  # and here it is handeled
-                await asyncio.sleep(1)
-            except Exception as e:
+                if isinstance(framer, BinaryFrameDecoder):
+                    last_seq = dispatch_binary_frames(items, last_seq)
+                else:
+                    dispatch_command_lines(items, sharedProperties)
+            except Exception:
                 metrics['errors'] += 1
-                logging.exception('Unexpected error accepting connection:')
-                await asyncio.sleep(1)
-        else:
-            await asyncio.sleep(1)
-    if sharedProperties.connection is not None:
-        sharedProperties.connection.close()
-        # ColorModule.turnOffBlueLed()
-        logging.info("Closed connection")
-    GPIO.cleanup()
-    logging.info("GPIO cleanup")
-    sock.shutdown(socket.SHUT_RDWR)
-    logging.info("Disconnected socket")
-
-async def thread_direction_controller(sharedProperties):
-    data = ""
+                logging.exception('Unexpected error in direction controller:')
+    except (ConnectionResetError, BrokenPipeError) as e:
+        logging.info(f"Client disconnected ({type(e).__name__})")
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        metrics['errors'] += 1
+        logging.exception('Unexpected error in control connection:')
+    finally:
+        sharedProperties.connections.discard(writer)
+        if not control_drivers_active(sharedProperties):
+            # Last driver gone: do not keep the motors running on its final command
+            motor_scheduler.stop()
+        try:
+            writer.close()
+        except Exception:
+            pass
+        logging.info("Closed connection %s", client_address)
+
+class UdpControlProtocol(asyncio.DatagramProtocol):
+    """Applies sequence-numbered UDP datagrams; stale or reordered ones are dropped, never applied."""
+
+    def __init__(self, sharedProperties):
+        self.sharedProperties = sharedProperties
+        self.trackers = {}
+
+    def _tracker_for(self, addr):
+        key = f"{addr[0]}:{addr[1]}"
+        tracker = self.trackers.get(key)
+        if tracker is None:
+            if len(self.trackers) >= UDP_MAX_TRACKED_CLIENTS:
+                # Forget the sender that has been quiet the longest
+                oldest = min(self.trackers, key=lambda k: self.trackers[k].last_accept_time)
+                del self.trackers[oldest]
+                metrics['udp_clients'].pop(oldest, None)
+            tracker = SequenceTracker()
+            self.trackers[key] = tracker
+        return key, tracker
+
+    def has_active_sender(self, now, window):
+        return any(now - tracker.last_accept_time < window for tracker in self.trackers.values())
+
+    def datagram_received(self, data, addr):
+        metrics['udp_datagrams'] += 1
+        key, tracker = self._tracker_for(addr)
+        try:
+            if is_binary_stream(data):
+                frames = BinaryFrameDecoder().feed(data)
+                if not frames:
+                    metrics['udp_rejected'] += 1
+                    return
+                if tracker.accept(frames[-1].seq, time.monotonic()):
+                    dispatch_binary_frames(frames[-1:], None)
+            else:
+                seq, lines = parse_text_datagram(data)
+                if seq is None:
+                    metrics['udp_rejected'] += 1
+                    if Config.DEBUG_ENABLED:
+                        logging.info('UDP datagram without sequence line from %s: %r', key, data)
+                    return
+                if tracker.accept(seq, time.monotonic()) and lines:
+                    dispatch_command_lines(lines, self.sharedProperties)
+        except Exception:
+            metrics['errors'] += 1
+            logging.exception('Unexpected error handling UDP control datagram:')
+        finally:
+            metrics['udp_clients'][key] = tracker.as_dict()
+
+    def error_received(self, exc):
+        logging.warning(f"UDP control socket error: {exc}")
+
+async def thread_udp_control_server(sharedProperties):
+    global udp_control
+    if not ENABLE_UDP_CONTROL:
+        return
+    loop = asyncio.get_running_loop()
+    transport, udp_control = await loop.create_datagram_endpoint(
+        lambda: UdpControlProtocol(sharedProperties),
+        local_addr=udp_server_address,
+    )
+    logging.info('UDP control listening on (%s,%s)', udp_server_address[0], udp_server_address[1])
+    try:
+        while not sharedProperties.endOfProgram:
+            await asyncio.sleep(0.2)
+    finally:
+        udp_control = None
+        transport.close()
+
+def control_drivers_active(sharedProperties):
+    # A TCP client drives while connected, a UDP sender while its datagrams keep coming
+    if sharedProperties.connections:
+        return True
+    return udp_control is not None and udp_control.has_active_sender(time.monotonic(), UDP_DRIVER_ACTIVE_SEC)
+
+async def thread_socket_server(sharedProperties):
+    logging.info('starting up on (%s,%s)', server_address[0], server_address[1])
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_control_client(reader, writer, sharedProperties),
+        server_address[0],
+        server_address[1],
+        reuse_address=True,
+    )
+    try:
+        # Only watches for shutdown; client I/O is driven by the per-connection coroutines
+        while not sharedProperties.endOfProgram:
+            await asyncio.sleep(0.2)
+    finally:
+        server.close()
+        for writer in list(sharedProperties.connections):
+            try:
+                writer.close()
+            except Exception:
+                pass
+        try:
+            await asyncio.wait_for(server.wait_closed(), timeout=2.0)
+        except Exception:
+            pass
+        GPIO.cleanup()
+        logging.info("GPIO cleanup")
+        logging.info("Disconnected socket")
+
+async def thread_motor_supervisor(sharedProperties):
+    """
+    Keeps the motor controller link alive without restarting the service.
+
+    When DirectionSystem reports a failed read or write the link is torn down,
+    targets are cleared (so a stale command is never replayed) and commands are
+    rejected until ports are re-probed in the background and a new connection
+    is swapped in. The time from failure to recovery is recorded in metrics.
+
+    Once a link has been up, only its own port (by-id name) is retried; the
+    full sweep over every serial port runs at most every
+    `motor_full_probe_interval_sec` and never opens a port blindly. Retries
+    back off exponentially from `motor_reconnect_interval_sec` to
+    `motor_reconnect_max_interval_sec`.
+    """
+    global direction, DIRECTION_SERIAL_PORT
+    loop = asyncio.get_running_loop()
+    link_failed = asyncio.Event()
+    min_retry_interval = CONFIG.get('motor_reconnect_interval_sec', 1.0)
+    max_retry_interval = max(min_retry_interval, CONFIG.get('motor_reconnect_max_interval_sec', 30.0))
+    full_probe_interval = CONFIG.get('motor_full_probe_interval_sec', 60.0)
+    retry_interval = min_retry_interval
+    last_full_probe = 0.0
+    last_link = None  # (port, handshake) of the last link that was up
+    down_since = None if direction is not None else time.monotonic()
+
+    def _watch(ds):
+        ds.failure_callback = lambda: loop.call_soon_threadsafe(link_failed.set)
+        if ds.link_failed:
+            link_failed.set()
+
+    if direction is not None:
+        _watch(direction)
+        last_link = (stable_port_path(DIRECTION_SERIAL_PORT), direction.firmware_info is not None)
     while not sharedProperties.endOfProgram:
-        await asyncio.sleep(0.001)
-        # If using Arduino for motor control, you may not need update_motors_periodic
-        # DirectionSystem.update_motors_periodic()
-        if sharedProperties.connection is not None:
+        if direction is not None:
             try:
-                raw = sharedProperties.connection.recv(2048)
-                if not raw:
-                    # Client disconnected
-                    logging.info("Client disconnected (recv returned empty)")
-                    sharedProperties.connection.close()
-                    sharedProperties.connection = None
-                    continue
-                data = raw.decode('utf-8')
-                if Config.DEBUG_ENABLED:
-                    logging.info('raw data: %r', data)
-                # Split and process each line
-                for line in data.splitlines():
-                    line = line.strip()
-                    if not line:
-                        continue
-                    if line.startswith("L:"):
-                        value = line[2:]
-                        if direction is not None:
-                            direction.set_speed_left(value)
-                            logging.info(f"Set left speed to {value}")
-                        else:
-                            logging.error("DirectionSystem unavailable; cannot set left speed")
-                        metrics['commands_processed'] += 1
-                    elif line.startswith("R:"):
-                        value = line[2:]
-                        if direction is not None:
-                            direction.set_speed_right(value)
-                            logging.info(f"Set right speed to {value}")
-                        else:
-                            logging.error("DirectionSystem unavailable; cannot set right speed")
-                        metrics['commands_processed'] += 1
-                    elif line == "reset":
-                        sharedProperties.endOfProgram = 1
-                        logging.info("Received reset command")
-                        metrics['commands_processed'] += 1
-                    # (other command handling as needed)
-            except (ConnectionResetError, BrokenPipeError) as e:
-                logging.info(f"Client disconnected ({type(e).__name__})")
-                if sharedProperties.connection:
-                    sharedProperties.connection.close()
-                sharedProperties.connection = None
-            except IOError as e:
-                await asyncio.sleep(0.05)
-            except Exception as e:
-                metrics['errors'] += 1
-                logging.exception('Unexpected error in direction controller:')
-                await asyncio.sleep(0.05)
+                await asyncio.wait_for(link_failed.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            link_failed.clear()
+            failed = direction
+            direction = None
+            motor_scheduler.direction = None
+            motor_scheduler.clear_targets()
+            down_since = time.monotonic()
+            retry_interval = min_retry_interval
+            last_full_probe = down_since  # the link's own port first; sweep later
+            metrics['motor_disconnects'] += 1
+            metrics['motor_link_state'] = 'reconnecting'
+            logging.error(f"Motor controller link on {DIRECTION_SERIAL_PORT} failed; reconnecting")
+            try:
+                await loop.run_in_executor(None, failed.close)
+            except Exception:
+                pass
+        now = time.monotonic()
+        if last_link is not None and now - last_full_probe < full_probe_interval:
+            found, port = await loop.run_in_executor(None, reopen_motor_port, *last_link)
         else:
-            await asyncio.sleep(1)
-    
+            last_full_probe = now
+            found, port = await loop.run_in_executor(None, probe_motor_controller, False)
+        if found is None:
+            retry_at = time.monotonic() + retry_interval
+            while not sharedProperties.endOfProgram and time.monotonic() < retry_at:
+                await asyncio.sleep(min(0.5, retry_at - time.monotonic()))
+            retry_interval = min(max_retry_interval, retry_interval * 2)
+            continue
+        if sharedProperties.endOfProgram:
+            found.close()
+            break
+        recovery_sec = round(time.monotonic() - down_since, 3)
+        direction = found
+        DIRECTION_SERIAL_PORT = port
+        _watch(found)
+        motor_scheduler.direction = found
+        last_link = (stable_port_path(port), found.firmware_info is not None)
+        retry_interval = min_retry_interval
+        if is_trusted_motor_link(found, port):
+            save_cached_motor_port(port)
+        metrics['motor_reconnects'] += 1
+        metrics['motor_link_state'] = 'connected'
+        metrics['motor_last_recovery_sec'] = recovery_sec
+        metrics['motor_max_recovery_sec'] = max(recovery_sec, metrics['motor_max_recovery_sec'] or 0.0)
+        logging.info(f"Motor controller reconnected on {port} after {recovery_sec}s")
 
 async def thread_detect_reset_switch(sharedProperties):
     while not sharedProperties.endOfProgram:
@@ -341,7 +797,7 @@ async def robotProgram():
     sharedProperties.forceStopForward = 0
     sharedProperties.forceStopBackward = 0
     sharedProperties.objectDetection = 999999
-    sharedProperties.connection = None
+    sharedProperties.connections = set()
     
     # Start health check server if enabled
     if ENABLE_HEALTH_SERVER:
@@ -350,15 +806,25 @@ async def robotProgram():
     camera_stream_task = None
     if ENABLE_CAMERA_STREAM:
         try:
-            from remotePiClasses.cameraStreamer import CameraStreamer
-            camera_streamer = CameraStreamer(
-                camera_index=CAMERA_INDEX,
-                frame_width=CAMERA_WIDTH,
-                frame_height=CAMERA_HEIGHT,
-                target_fps=CAMERA_FPS,
-                jpeg_quality=CAMERA_JPEG_QUALITY,
-                debug=bool(Config.DEBUG_ENABLED),
-            )
+            if CAMERA_CONFIGS:
+                # Several cameras behind one server, e.g. /front/camera.mjpg and /rear/camera.mjpg
+                from remotePiClasses.cameraManager import CameraManager
+                camera_streamer = CameraManager(
+                    cpu_budget_cores=CAMERA_CPU_BUDGET_CORES,
+                    bandwidth_budget_kbps=CAMERA_BANDWIDTH_BUDGET_KBPS,
+                    saturation_percent=CAMERA_SATURATION_PERCENT,
+                    debug=bool(Config.DEBUG_ENABLED),
+                )
+                for position, entry in enumerate(CAMERA_CONFIGS):
+                    name = entry.get('name', f'camera{position}')
+                    camera_streamer.add_camera(
+                        name,
+                        build_camera_streamer(dict(entry, name=name), position),
+                        cpu_share=entry.get('cpu_share', 1.0),
+                        bandwidth_share=entry.get('bandwidth_share', 1.0),
+                    )
+            else:
+                camera_streamer = build_camera_streamer({}, 0)
             async def _start_camera():
                 try:
                     await camera_streamer.start(CAMERA_STREAM_HOST, CAMERA_STREAM_PORT)
@@ -366,13 +832,17 @@ async def robotProgram():
                     logging.exception("Failed to start camera stream server")
             camera_stream_task = asyncio.create_task(_start_camera())
         except Exception:
-            logging.exception("CameraStreamer not available")
+            logging.exception("Camera streaming not available")
             camera_stream_task = None
 
+    vision_task = asyncio.create_task(vision_worker.run(sharedProperties)) if vision_worker is not None else None
+
     try:
         await asyncio.gather(
             thread_socket_server(sharedProperties),
-            thread_direction_controller(sharedProperties),
+            thread_udp_control_server(sharedProperties),
+            motor_scheduler.run(sharedProperties),
+            thread_motor_supervisor(sharedProperties),
             thread_detect_reset_switch(sharedProperties),
             thread_screen_controller(sharedProperties),
             disk_monitor_task(),
@@ -391,6 +861,12 @@ async def robotProgram():
                 await camera_streamer.stop()
             except Exception:
                 logging.exception("Error while stopping camera streamer")
+        if vision_task is not None:
+            vision_task.cancel()
+            try:
+                await vision_task
+            except BaseException:
+                pass
         if camera_stream_task is not None:
             try:
                 camera_stream_task.cancel()